@@ -1,18 +1,31 @@
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
-from prompts import moments_template , podcast_selector_prompt
+from prompts import moments_template , moments_compact_template , podcast_selector_prompt
 from langgraph.graph import END, StateGraph
+from langgraph.config import get_config
 from typing import List
-from schema import MomentsList , Moment , Best_Podcast
+from schema import MomentsList , Moment , Best_Podcast , CompactMomentsList
 from state import AgentState
 from dotenv import load_dotenv
 from copy import deepcopy
-from tools import yt_tool ,send_video , upload_video , report_error , youtube_tool , trim_media , get_youtube_object , convert_and_add_captions , print_green , print_yellow
+from tools import yt_tool ,send_video , upload_video , report_error , youtube_tool , trim_media , get_youtube_object , fetch_youtube_objects , download_section , download_sections , convert_and_add_captions , print_green , print_yellow
 from constants import *
-from chunking import chunk_srt_by_chars , save_srt , extract_srt_segment
+from chunking import iter_transcript_chunks , dedupe_moments , decode_compact_span , save_srt , extract_srt_segment , Transcript , normalize_auto_captions , format_srt_time
+from ratelimit import TokenBucketLimiter , batch_with_limiter
+from cache import LLMResponseCache , CachedStructuredChain
+from pipeline import run_pipeline
+from upload_queue import UploadQueue , spool_clip
+from checkpoints import get_checkpointer , ArtifactStore , plan_runs , close_run
+from podcast_history import BurntPodcastStore
+from transcripts import fetch_transcript , transcript_store , YouTubeCaptionsProvider
+import metrics
+from render import render_clips_single_pass , render_clips_parallel , plan_render_slots , in_render_slot , to_seconds
 import json
 import time
 import shutil
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 assert os.getenv("GOOGLE_API_KEY"), "Missing GOOGLE_API_KEY in .env"
 assert os.getenv("GOOGLE_PROJECT_ID") , "Missing GOOGLE_PROJECT_ID in .env"
@@ -20,24 +33,62 @@ assert os.getenv("GOOGLE_PROJECT_ID") , "Missing GOOGLE_PROJECT_ID in .env"
 load_dotenv()
 model_name = "gemini-2.0-flash"
 
+model_kwargs = {
+    "project_id":os.getenv("GOOGLE_PROJECT_ID"),
+
+    # CUSTOMIZE AGENT ARGS TO GET THE BEST OUTPUT FOR YOUR NEEDS
+    # "temperature": 0.7,           
+    # "top_p": 0.9,
+    # "top_k": 40,
+    # "max_output_tokens": 1024
+}
+
 llm = ChatGoogleGenerativeAI(
     model=model_name,
-    model_kwargs = {
-        "project_id":os.getenv("GOOGLE_PROJECT_ID"),
-
-        # CUSTOMIZE AGENT ARGS TO GET THE BEST OUTPUT FOR YOUR NEEDS
-        # "temperature": 0.7,           
-        # "top_p": 0.9,
-        # "top_k": 40,
-        # "max_output_tokens": 1024
-    }
+    model_kwargs = model_kwargs
     
 )
 
+llm_limiter = TokenBucketLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+llm_cache = LLMResponseCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+def cached_chain(prompt, schema):
+    """
+    Builds the structured output chain for a prompt , backed by the LLM response cache.
+    """
+    return CachedStructuredChain(prompt, llm, schema, llm_cache, model_name, model_kwargs, limiter=llm_limiter)
+
+upload_queue = UploadQueue() if UPLOAD_MODE == "queue" else None
+artifacts = ArtifactStore()
+burnt_podcasts = BurntPodcastStore()
+
+# The cycles of this process select one at a time , the claims in the checkpoint store
+# keep them (and overlapping cron runs) off each other's podcasts
+selection_lock = threading.Lock()
+
+
+def clear_workspace(video_id):
+    """
+    Removes the workspace and the clip artifacts of a podcast
+    """
+    artifacts.clear(video_id)
+    # Only this podcast's folder , other cycles may still be working next to it
+    shutil.rmtree(os.path.join(DATA_DIR, video_id), ignore_errors=True)
+
+
+def discard_podcast(video_id):
+    """
+    Removes the workspace and the clip artifacts of a podcast and releases its claim
+    """
+    clear_workspace(video_id)
+    artifacts.release(video_id=video_id)
+
 youtube_filter_codes = {
     "week" : "EgIIAw",
     "month" : "EgQIBBAB"
 }
+# Search filters tried in turn when nothing fresh is found , None is the unfiltered search
+retry_filters = [None, "month", "week"]
 def search_podcasts(state:AgentState):
     """
     Searches for trending podcasts on YouTube.
@@ -51,18 +102,33 @@ def search_podcasts(state:AgentState):
 
     podcast_list = json.loads(podcast_list)
 
-    try:
-        for podcast in podcast_list['videos']:
-            description , lang = get_youtube_object.invoke(podcast['id'])
-            del podcast['thumbnails']
-            del podcast['long_desc']
-            podcast['description'] = description
-            # podcast['youtube_object'] = youtube_object
-            podcast['subtitle_lang'] = lang
-    except Exception as e:
-        print(f"SKIPPING {podcast['id']} due to {e}")
+    videos = podcast_list['videos']
+    # Burnt podcasts are dropped here so neither yt-dlp nor the selector prompt ever sees them
+    burnt = burnt_podcasts.burnt(podcast['id'] for podcast in videos)
+    if burnt:
+        print(f"SKIPPING {len(burnt)} BURNT PODCASTS")
+    videos = [podcast for podcast in videos if podcast['id'] not in burnt]
+    # Podcasts other cycles are working on , in this process or an overlapping run
+    claimed = artifacts.claimed(podcast['id'] for podcast in videos)
+    if claimed:
+        print(f"SKIPPING {len(claimed)} PODCASTS CLAIMED BY OTHER RUNS")
+    videos = [podcast for podcast in videos if podcast['id'] not in claimed]
+    metadata = fetch_youtube_objects([podcast['id'] for podcast in videos])
+
+    podcasts = []
+    for podcast, podcast_metadata in zip(videos, metadata):
+        if podcast_metadata is None:
+            print(f"SKIPPING {podcast['id']} due to failed metadata lookup")
+            continue
+        description , lang = podcast_metadata
+        podcast.pop('thumbnails', None)
+        podcast.pop('long_desc', None)
+        podcast['description'] = description
+        # podcast['youtube_object'] = youtube_object
+        podcast['subtitle_lang'] = lang
+        podcasts.append(podcast)
     return {
-        "podcast_list":podcast_list['videos']
+        "podcast_list":podcasts
     }
 
 
@@ -71,21 +137,43 @@ def get_best_podcast_from_llm(state:AgentState):
     Filters the best podcast out of the trending ones.
     """
     print_green("FETCHING BEST PODCASTS .....")
-    fp = open('burnt_podcasts.json' , 'r')
-    excluded_list = json.load(fp)
-    fp.close()
-
-    chain = podcast_selector_prompt | llm.with_structured_output(Best_Podcast)
-    filtered_podcast_list = [
-    {k: v for k, v in podcast.items() if k != 'subtitle_lang'}
-    for podcast in state["podcast_list"]
-]
-    result = chain.invoke({"podcast_list":filtered_podcast_list , "excluded_list":excluded_list})
-    if result.selected == False:
-        state['retry'] = 'month' if state['retry']==None else 'week'
-    podcast_metadata = next((p for p in state["podcast_list"] if p['id'] == result.video_id), None)
+    chain = cached_chain(podcast_selector_prompt, Best_Podcast)
+
+    thread_id = get_config()["configurable"]["thread_id"]
+
+    with selection_lock:
+        # Only fresh candidates reach the prompt , burnt ones were dropped by SEARCH_PODCASTS
+        candidates = state["podcast_list"]
+        podcast_metadata = None
+        while podcast_metadata is None:
+            # Claimed since the search , or lost to another run while the model was choosing
+            claimed = artifacts.claimed(podcast['id'] for podcast in candidates)
+            candidates = [podcast for podcast in candidates if podcast['id'] not in claimed]
+            filtered_podcast_list = [
+                {k: v for k, v in podcast.items() if k != 'subtitle_lang'}
+                for podcast in candidates
+            ]
+            if not filtered_podcast_list:
+                break
+            result = chain.invoke({"podcast_list":filtered_podcast_list})
+            if not result.selected:
+                break
+            selected = next((p for p in candidates if p['id'] == result.video_id), None)
+            if selected is None:
+                break
+            if artifacts.claim(selected["id"], thread_id):
+                podcast_metadata = selected
+            else:
+                candidates = [podcast for podcast in candidates if podcast['id'] != selected["id"]]
+        if podcast_metadata is None:
+            # The next filter , or None with no podcast once every filter was tried
+            remaining = retry_filters[retry_filters.index(state['retry']) + 1:]
+            return {"retry" : remaining[0] if remaining else None , "podcast" : {} , "podcast_list" :[]}
+    # Whatever a dead run left of this podcast is stale , the new run starts from scratch
+    clear_workspace(podcast_metadata["id"])
 
     return {
+        "retry" : None,
         "podcast" : {
             "podcast_title" : podcast_metadata["title"],
             "podcast_description" : podcast_metadata["description"],
@@ -105,155 +193,504 @@ def get_clips(state:AgentState):
     Gets the best moments of the podcast using transcriptions.
     """
     print_yellow("GETTING BEST CLIPS ......")
-    chain = moments_template | llm.with_structured_output(MomentsList)
-    chunks = chunk_srt_by_chars(state["podcast"]["transcript"])
+    compact = TRANSCRIPT_FORMAT == "compact"
+    if compact:
+        chain = cached_chain(moments_compact_template, CompactMomentsList)
+    else:
+        chain = cached_chain(moments_template, MomentsList)
+    transcript = state["podcast"]["transcript"]
+    max_tokens = CHUNK_MAX_TOKENS or MODEL_CHUNK_TOKENS.get(model_name, DEFAULT_CHUNK_TOKENS)
+    chunks = iter_transcript_chunks(transcript, max_tokens, overlap_seconds=CHUNK_OVERLAP_SECONDS,
+                                    text_format=TRANSCRIPT_FORMAT)
     moments:List[Moment] = []
-    print("NUMBER OF CHUNKS :: " ,len(chunks))
-    for chunk in chunks:
-        result = chain.invoke({
-            "podcast_title" : state["podcast"]["podcast_title"],
-            "podcast_description" : state["podcast"]["podcast_description"],
-            "transcript" : chunk["srt_text"]
-        })
+    chunk_starts = []
+
+    def inputs():
+        for chunk in chunks:
+            chunk_starts.append(chunk["start_ms"])
+            yield {
+                "podcast_title" : state["podcast"]["podcast_title"],
+                "podcast_description" : state["podcast"]["podcast_description"],
+                "transcript" : chunk["srt_text"]
+            }
+
+    results = batch_with_limiter(chain, inputs(), None, max_workers=LLM_MAX_CONCURRENCY)
+    print("NUMBER OF CHUNKS :: " ,len(results))
+    for result, chunk_start in zip(results, chunk_starts):
+        if result is None:
+            continue
         for moment in result.Moments:
+            if compact:
+                # Offsets of the compact format back to exact SRT times
+                start_time, end_time = decode_compact_span(transcript, chunk_start, moment.start_time, moment.end_time)
+                moment = Moment(**{**moment.model_dump(), "start_time": start_time, "end_time": end_time})
             moments.append(moment)
-        time.sleep(5)
 
+    # Overlapping chunks can report the same moment twice
+    moments = dedupe_moments(moments)
     return  {"Moments":moments }
 
 
 def process_moments(state):
     """
     Extracts the subtitles of the moments from the main transcript.
+    When the moments were downloaded as sections the subtitles are moved onto the section timeline.
     """
     clips = 0
+    clip_sources = state.get('clip_sources') or []
     for i, moment in enumerate(state['Moments']):
         clips+=1
         
-        subs = extract_srt_segment(state['podcast']['transcript'], moment.start_time, moment.end_time)
-        save_srt(subs, f'./data/{i}_subs.srt')
+        offset = clip_sources[i]["offset"] if clip_sources else 0.0
+        save_clip_subs(state['podcast']['video_id'], state['podcast']['transcript'], i, moment, offset)
     print_green(f"NO OF CLIPS :: {clips}")
 
 
+def workspace(video_id, name=""):
+    """
+    Path inside the working directory of one podcast , so podcasts processed at the same time
+    (or by overlapping cron runs) never share files
+    """
+    path = os.path.join(DATA_DIR, video_id)
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, name)
 
-def edit_video(state):
+
+def save_clip_subs(video_id, transcript, i, moment, offset=0.0):
     """
-    Edits the video trims, change orientation, adds the blur background effect , and burn the subtitles on the video
+    Saves the subtitles of one moment , moved back by `offset` seconds when the clip comes from a section.
     """
-    print_green("EDITING VIDEOS ......")
-    process_moments(state)
-    for i, moment in enumerate(state['Moments']):
-        trim_media_input_data = {
-    "input_file":"./data/current_podcast.mp4",
-    "output_file":f"./data/{i}_index.mp4",
+    subs = extract_srt_segment(transcript, moment.start_time, moment.end_time)
+    save_srt(subs, workspace(video_id, f'{i}_subs.srt'), shift_ms=round(offset * 1000))
+
+
+def clip_job(video_id, i, moment, encoder_profile, source=None):
+    """
+    Keyword arguments of `render_moment` for one clip , from the full podcast or from its downloaded section.
+    """
+    input_video = workspace(video_id, "current_podcast.mp4")
+    if source is not None:
+        # Moment times relative to the downloaded section
+        input_video = source["input_video"]
+        moment = moment.model_copy(update={
+            "start_time" : format_srt_time((to_seconds(moment.start_time) - source["offset"]) * 1000),
+            "end_time" : format_srt_time((to_seconds(moment.end_time) - source["offset"]) * 1000)
+        })
+    return {
+        "input_video" : input_video,
+        "moment" : moment,
+        "trimmed_video" : workspace(video_id, f'{i}_index.mp4'),
+        "srt_file" : workspace(video_id, f'{i}_subs.srt'),
+        "output_video" : workspace(video_id, f'{i}_final.mp4'),
+        "encoder_profile" : encoder_profile
+    }
+
+
+
+def render_moment(input_video, moment, trimmed_video, srt_file, output_video, encoder_profile=None, threads=None):
+    """
+    Trims one moment out of the podcast and renders it into a captioned 9:16 clip.
+    In the direct render mode the moment is cut inside the final encode without a trimmed file.
+    """
+    if RENDER_MODE == "direct":
+        return convert_and_add_captions(input_video , srt_file , output_video, threads=threads,
+                                        start_time=moment.start_time, end_time=moment.end_time,
+                                        encoder_profile=encoder_profile)
+
+    trim_media_input_data = {
+    "input_file":input_video,
+    "output_file":trimmed_video,
     "start_time":moment.start_time.replace(",", "."),
     "end_time":moment.end_time.replace(",", ".")
 }
 
-        trim_media(trim_media_input_data)
+    if not trim_media(trim_media_input_data):
+        raise RuntimeError(f"trimming {moment.start_time} - {moment.end_time} failed")
+
+    return convert_and_add_captions(trimmed_video , srt_file , output_video, threads=threads,
+                                    encoder_profile=encoder_profile)
 
-        convert_and_add_captions(f'./data/{i}_index.mp4' , f'./data/{i}_subs.srt' , f'./data/{i}_final.mp4')
+
+def edit_video(state):
+    """
+    Edits the video trims, change orientation, adds the blur background effect , and burn the subtitles on the video
+    """
+    print_green("EDITING VIDEOS ......")
+    process_moments(state)
+    video_id = state["podcast"]["video_id"]
+    encoder_profile = state.get("render_profile") or RENDER_PROFILE
+    clip_sources = state.get("clip_sources") or []
+    # Clips finished before a crash are kept
+    rendered = artifacts.done(video_id, ArtifactStore.RENDERED)
+    if rendered:
+        print_green(f"SKIPPING {len(rendered)} CLIPS RENDERED BEFORE")
+    if RENDER_MODE == "single_pass" and not clip_sources:
+        clip_ids = [i for i in range(len(state['Moments'])) if i not in rendered]
+        clips = [{
+            "start_time" : state['Moments'][i].start_time,
+            "end_time" : state['Moments'][i].end_time,
+            "srt_file" : workspace(video_id, f'{i}_subs.srt'),
+            "output_video" : workspace(video_id, f'{i}_final.mp4')
+        } for i in clip_ids]
+        if not clips or render_clips_single_pass(workspace(video_id, "current_podcast.mp4"), clips, encoder_profile=encoder_profile):
+            for i, clip in zip(clip_ids, clips):
+                artifacts.record(video_id, i, ArtifactStore.RENDERED, clip["output_video"])
+            return {"render_errors": []}
+        return {"render_errors": [
+            {"clip": i, "output_video": clip["output_video"], "error": "single pass ffmpeg failed"}
+            for i, clip in zip(clip_ids, clips)
+        ]}
+
+    jobs = []
+    clip_ids = []
+    render_errors = []
+    for i, moment in enumerate(state['Moments']):
+        if i in rendered:
+            continue
+        source = clip_sources[i] if clip_sources else None
+        if source is not None and source["input_video"] is None:
+            render_errors.append({"clip": i, "output_video": workspace(video_id, f'{i}_final.mp4'), "error": "section download failed"})
+            continue
+        clip_ids.append(i)
+        jobs.append(clip_job(video_id, i, moment, encoder_profile, source))
+
+    failed = set()
+    for error in render_clips_parallel(jobs, render_moment):
+        failed.add(error["clip"])
+        render_errors.append({**error, "clip": clip_ids[error["clip"]]})
+    for k, job in enumerate(jobs):
+        if k not in failed:
+            artifacts.record(video_id, clip_ids[k], ArtifactStore.RENDERED, job["output_video"])
+    render_errors.sort(key=lambda e: e["clip"])
+    for error in render_errors:
+        print(f"CLIP {error['clip']} FAILED :: {error['error']}")
+    return {"render_errors": render_errors}
 
 def process_video(state):
     """
     Processes video extracts description metadata , subtitles
     """
     print_yellow("PROCESSING VIDEO .....")
-    transcript = youtube_tool(state["podcast"]["video_id"] , state["podcast"]["subtitle_lang"])
+    video_id = state["podcast"]["video_id"]
+    lang = state["podcast"]["subtitle_lang"]
+    video_path = workspace(video_id, "current_podcast.mp4")
+    if DOWNLOAD_MODE != "sections":
+        # The auto captions come with the video , unless the transcript is already stored
+        youtube_tool(video_id , None if transcript_store.has(video_id) else lang, output_path=video_path)
+    # Stored transcript , else YouTube captions , else local ASR
+    transcript_path, source = fetch_transcript(video_id, lang, video_path)
     new_state = deepcopy(state)
+    # Parsed once here and shared by FETCH_CLIPS and EDIT_VIDEO
+    transcript = Transcript.from_srt(transcript_path)
+    # Only auto captions roll , ASR segments may repeat a phrase for real
+    if NORMALIZE_CAPTIONS and source == YouTubeCaptionsProvider.name:
+        cues = len(transcript)
+        transcript = normalize_auto_captions(transcript)
+        print(f"NORMALIZED CAPTIONS :: {cues} -> {len(transcript)} cues")
     new_state["podcast"]["transcript"] = transcript
     return new_state
 
+def clip_section(video_id, i, moment):
+    """
+    (start , end , output_path) of the padded section to download for a moment
+    """
+    start = max(0.0, to_seconds(moment.start_time) - DOWNLOAD_SECTION_PADDING)
+    end = to_seconds(moment.end_time) + DOWNLOAD_SECTION_PADDING
+    return start, end, workspace(video_id, f'{i}_section.mp4')
+
+def download_clips(state):
+    """
+    Downloads only the selected moments (with some padding) when the podcast itself was not downloaded
+    """
+    if DOWNLOAD_MODE != "sections":
+        return {"clip_sources": []}
+    print_yellow("DOWNLOADING CLIPS .....")
+    sections = [clip_section(state["podcast"]["video_id"], i, moment) for i, moment in enumerate(state['Moments'])]
+    # Already rendered clips need no section , EDIT_VIDEO skips them
+    rendered = artifacts.done(state["podcast"]["video_id"], ArtifactStore.RENDERED)
+    pending = [i for i in range(len(sections)) if i not in rendered]
+
+    downloaded = dict(zip(pending, download_sections(state["podcast"]["video_id"], [sections[i] for i in pending])))
+    return {"clip_sources": [
+        {"input_video": path if downloaded.get(i, True) else None, "offset": start}
+        for i, (start, _, path) in enumerate(sections)
+    ]}
+
 def post_video(state):
     """
     Posts the clips on youtube using v3 api
     """
     print_green("POSTING VIDEOS .....")
+    video_id = state["podcast"]["video_id"]
     post_metadata = []
+    failed_clips = {error["clip"] for error in state.get("render_errors") or []}
+    if failed_clips:
+        send_video.invoke(f"{len(failed_clips)} CLIPS FAILED TO RENDER")
+    # Clips uploaded before a crash are not posted twice
+    uploaded = artifacts.done(video_id, ArtifactStore.UPLOADED)
     for i, moment in enumerate(state['Moments']):
-        meta_data = {}
-        meta_data['clip_addr'] = f'./data/{i}_final.mp4'
-        meta_data['title'] = moment.title
-        meta_data["description"] = moment.description
-        meta_data["keywords"] = moment.keywords
-        post_metadata.append(meta_data)
+        if i in failed_clips or i in uploaded:
+            continue
+        post_metadata.append((i, clip_metadata(video_id, i, moment)))
     #state['podcast']['video_id'] =  "EDBFFgs6Ifs"
     print("Final Metadata is :: " , post_metadata)
-    with open('burnt_podcasts.json', 'r+') as fp:
-        try:
-            burnt_podcasts = json.load(fp)
-        except json.JSONDecodeError:
-            burnt_podcasts = []
-
-        burnt_podcasts.append(state["podcast"]["video_id"])
-
-        # Go back to beginning and truncate before dumping
-        fp.seek(0)
-        fp.truncate()
-        json.dump(burnt_podcasts, fp, indent=2)
+    mark_podcast_burnt(video_id, state["podcast"].get("podcast_title"))
+    if UPLOAD_MODE == "queue":
+        for i, video in post_metadata:
+            queue_upload(video_id, i, video)
+            artifacts.record(video_id, i, ArtifactStore.UPLOADED, video['clip_addr'])
+        send_video.invoke(f"QUEUED {len(post_metadata)} videos for upload ...")
+        return finish_cycle(video_id)
+
     print_yellow(f"UPLOADING {len(post_metadata)} videos ......")
     send_video.invoke(f"UPLOADING {len(post_metadata)} videos ...")
-    for video in post_metadata:
-        upload_video(video['clip_addr'] , metadata=video)
-        time.sleep(300)
 
-    folder_path = './data'
+    def post(clip):
+        i, video = clip
+        if not upload_video(video['clip_addr'] , metadata=video):
+            return False
+        artifacts.record(video_id, i, ArtifactStore.UPLOADED, video['clip_addr'])
+        return True
+
+    if UPLOAD_INTERVAL_SECONDS <= 0:
+        # Nothing to pace , upload the clips side by side over the shared YouTube client
+        with ThreadPoolExecutor(max_workers=max(1, UPLOAD_CONCURRENCY)) as pool:
+            posted = list(pool.map(post, post_metadata))
+    else:
+        posted = []
+        for clip in post_metadata:
+            posted.append(post(clip))
+            with metrics.track("upload_sleep"):
+                time.sleep(UPLOAD_INTERVAL_SECONDS)
+
+    if not all(posted):
+        # Keeps the workspace and the checkpoint , the next run resumes here with the missing uploads
+        raise RuntimeError(f"{posted.count(False)} of {len(posted)} uploads failed")
+    return finish_cycle(video_id)
+
 
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        if os.path.isfile(file_path) or os.path.islink(file_path):
-            os.remove(file_path)
-        elif os.path.isdir(file_path):
-            shutil.rmtree(file_path)
+def clip_metadata(video_id, i, moment):
+    """
+    Upload metadata of a rendered clip
+    """
+    meta_data = {}
+    meta_data['clip_addr'] = workspace(video_id, f'{i}_final.mp4')
+    meta_data['title'] = moment.title
+    meta_data["description"] = moment.description
+    meta_data["keywords"] = moment.keywords
+    return meta_data
+
+
+def queue_upload(video_id, i, metadata):
+    """
+    Moves a clip to the upload spool and schedules it on the persistent upload queue
+    """
+    clip_addr = spool_clip(metadata['clip_addr'], f"{video_id}_{i}.mp4")
+    return upload_queue.enqueue(clip_addr, {**metadata, "clip_addr": clip_addr})
+
+
+def mark_podcast_burnt(video_id, title=None):
+    """
+    Adds the podcast to the burnt podcast store so it is never selected again
+    """
+    # An upsert , a resumed POST_VIDEO marks the same podcast again
+    burnt_podcasts.mark(video_id, title)
+
+
+def finish_cycle(video_id):
+    """
+    Removes the workspace and the clip artifacts of the podcast and resets the state for the next cycle
+    """
+    discard_podcast(video_id)
 
     send_video.invoke("Completed cycle ...")
     return {
         "podcast" : {},
         "podcast_list" : [],
         "Moments":[],
+        "render_errors":[],
+        "clip_sources":[],
         "agent_outcome": None,
         "intermediate_steps": []
     }
 
 
+def pipeline_clips(state):
+    """
+    Streams every moment through download -> render -> upload with bounded queues ,
+    so the next clip renders while the current one uploads and waits out the upload interval.
+    Replaces DOWNLOAD_CLIPS , EDIT_VIDEO and POST_VIDEO when PIPELINE_MODE is on.
+    """
+    print_green("PIPELINING CLIPS .....")
+    transcript = state['podcast']['transcript']
+    video_id = state["podcast"]["video_id"]
+    encoder_profile = state.get("render_profile") or RENDER_PROFILE
+    moments = state['Moments']
+    _, threads = plan_render_slots(1)
+    last_upload = [None]
+    # Clips finished before a crash skip the stages they already went through
+    rendered = artifacts.done(video_id, ArtifactStore.RENDERED)
+    uploaded = artifacts.done(video_id, ArtifactStore.UPLOADED)
+    pending = [(i, moment) for i, moment in enumerate(moments) if i not in uploaded]
+
+    def prepare(clip):
+        i, moment = clip
+        if i in rendered:
+            return i, moment, None
+        source = None
+        if DOWNLOAD_MODE == "sections":
+            start, end, path = clip_section(video_id, i, moment)
+            if not download_section(video_id, start, end, path):
+                raise RuntimeError("section download failed")
+            source = {"input_video": path, "offset": start}
+        save_clip_subs(video_id, transcript, i, moment, source["offset"] if source else 0.0)
+        return i, moment, clip_job(video_id, i, moment, encoder_profile, source)
+
+    def render(prepared):
+        i, moment, job = prepared
+        if job is None:
+            return i, moment
+        if not in_render_slot(render_moment, threads=threads, **job):
+            raise RuntimeError("ffmpeg failed")
+        artifacts.record(video_id, i, ArtifactStore.RENDERED, job["output_video"])
+        return i, moment
+
+    def upload(rendered):
+        i, moment = rendered
+        metadata = clip_metadata(video_id, i, moment)
+        if UPLOAD_MODE == "queue":
+            queue_upload(video_id, i, metadata)
+            artifacts.record(video_id, i, ArtifactStore.UPLOADED, metadata['clip_addr'])
+            return i
+        if last_upload[0] is not None:
+            with metrics.track("upload_sleep"):
+                time.sleep(max(0.0, UPLOAD_INTERVAL_SECONDS - (time.monotonic() - last_upload[0])))
+        ok = upload_video(metadata['clip_addr'] , metadata=metadata)
+        last_upload[0] = time.monotonic()
+        if not ok:
+            raise RuntimeError("upload failed")
+        artifacts.record(video_id, i, ArtifactStore.UPLOADED, metadata['clip_addr'])
+        return i
+
+    mark_podcast_burnt(video_id, state["podcast"].get("podcast_title"))
+    send_video.invoke(f"UPLOADING {len(pending)} videos ...")
+    # One render at a time here , the overlap with downloads and uploads keeps the cores busy
+    posted, errors = run_pipeline(pending, [
+        ("download", prepare, DOWNLOAD_WORKERS if DOWNLOAD_MODE == "sections" else 1),
+        ("render", render, 1),
+        ("upload", upload, 1),
+    ], queue_size=PIPELINE_QUEUE_SIZE)
+
+    print_green(f"UPLOADED {len(posted)} OF {len(pending)} CLIPS")
+    if errors:
+        send_video.invoke(f"{len(errors)} CLIPS FAILED IN THE PIPELINE")
+        # Keeps the workspace and the checkpoint , the next run resumes here with the failed clips
+        raise RuntimeError(f"{len(errors)} of {len(pending)} clips failed in the pipeline")
+    return finish_cycle(video_id)
+
+
+def route_clips(state):
+    """
+    Sends the moments through the streaming pipeline or through the staged nodes
+    """
+    return PIPELINE_CLIPS if PIPELINE_MODE else DOWNLOAD_CLIPS
+
+
 def where_to_go(state):
     """
-    Changes the filter to current week/month if all the podcasts are burnt
+    Changes the filter to current week/month if all the podcasts are burnt ,
+    ends the cycle when even the last filter found nothing
     """
     if state['retry'] != None:
         send_video.invoke("Podcasts exhausted retrying with filter")
         return SEARCH_PODCASTS
+    if not state['podcast'].get('video_id'):
+        send_video.invoke("No fresh podcast found with any filter , skipping this cycle")
+        return END
     return PROCESS_VIDEO
 
 def report_error_node(state):
     send_video.invoke("ERROR OCCURRED")
 graph = StateGraph(AgentState)
-graph.add_node(SEARCH_PODCASTS , search_podcasts)
-graph.add_node(SELECT_BEST_PODCAST , get_best_podcast_from_llm)
-graph.add_node(PROCESS_VIDEO , process_video)
-graph.add_node(FETCH_CLIPS , get_clips)
-graph.add_node(EDIT_VIDEO , edit_video)
-graph.add_node(POST_VIDEO , post_video)
-graph.add_node(REPORT_ERROR , report_error_node)
+graph.add_node(SEARCH_PODCASTS , metrics.node(SEARCH_PODCASTS , search_podcasts))
+graph.add_node(SELECT_BEST_PODCAST , metrics.node(SELECT_BEST_PODCAST , get_best_podcast_from_llm))
+graph.add_node(PROCESS_VIDEO , metrics.node(PROCESS_VIDEO , process_video))
+graph.add_node(FETCH_CLIPS , metrics.node(FETCH_CLIPS , get_clips))
+graph.add_node(DOWNLOAD_CLIPS , metrics.node(DOWNLOAD_CLIPS , download_clips))
+graph.add_node(EDIT_VIDEO , metrics.node(EDIT_VIDEO , edit_video))
+graph.add_node(POST_VIDEO , metrics.node(POST_VIDEO , post_video))
+graph.add_node(PIPELINE_CLIPS , metrics.node(PIPELINE_CLIPS , pipeline_clips))
+graph.add_node(REPORT_ERROR , metrics.node(REPORT_ERROR , report_error_node))
 
 graph.add_conditional_edges(SELECT_BEST_PODCAST , where_to_go)
 graph.add_edge(SEARCH_PODCASTS , SELECT_BEST_PODCAST)
-graph.add_edge(SELECT_BEST_PODCAST , PROCESS_VIDEO)
 graph.add_edge(PROCESS_VIDEO , FETCH_CLIPS)
-graph.add_edge(FETCH_CLIPS , EDIT_VIDEO)
+graph.add_conditional_edges(FETCH_CLIPS , route_clips)
+graph.add_edge(DOWNLOAD_CLIPS , EDIT_VIDEO)
 graph.add_edge(EDIT_VIDEO , POST_VIDEO)
 graph.add_edge(POST_VIDEO , end_key=END)
+graph.add_edge(PIPELINE_CLIPS , end_key=END)
 graph.set_entry_point(SEARCH_PODCASTS)
 
-app = graph.compile()
+app = graph.compile(checkpointer=get_checkpointer())
 
-if __name__ == "__main__":
-    app.invoke({
+def initial_state():
+    return {
         "input": "Answer according to instructions.",
         "podcast": {},
         "Moments": [],
         "agent_outcome": None,
         "intermediate_steps": [],
         "podcast_list": [],
+        "render_errors": [],
+        "clip_sources": [],
+        "render_profile": None,
         "retry": None
-    })
+    }
+
+
+def run_cycle(config, resume):
+    """
+    Runs one podcast through the graph , or continues it from its checkpoint after a crash
+    """
+    thread_id = config["configurable"]["thread_id"]
+    if resume:
+        podcast = app.get_state(config).values.get("podcast") or {}
+        if podcast.get("video_id") and not artifacts.claim(podcast["video_id"], thread_id):
+            # Another live run took the podcast over after this one crashed , its workspace is theirs now
+            print(f"DROPPING RUN {thread_id} , {podcast['video_id']} IS CLAIMED BY ANOTHER RUN")
+            close_run(app, artifacts, thread_id)
+            return
+    try:
+        with metrics.cycle(thread_id):
+            app.invoke(None if resume else initial_state(), config)
+    except Exception:
+        # The workspace and the checkpoint stay for the resume , the resumed run claims the podcast again
+        artifacts.release(thread_id=thread_id)
+        raise
+    close_run(app, artifacts, thread_id)
+
+
+def run_cycles(count=CONCURRENT_PODCASTS):
+    """
+    Processes `count` podcasts at once. Downloads , LLM calls and render slots are shared
+    process wide , so the cycles queue on the same limits instead of multiplying them.
+    """
+    # Runs that crashed continue at the node that failed
+    runs = plan_runs(app, artifacts, count, on_give_up=discard_podcast)
+    failures = []
+    with ThreadPoolExecutor(max_workers=len(runs)) as pool:
+        futures = [pool.submit(run_cycle, config, resume) for config, resume in runs]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                traceback.print_exc()
+                failures.append(e)
+    if failures:
+        raise failures[0]
+
+
+if __name__ == "__main__":
+    metrics.serve()
+    run_cycles()
@@ -0,0 +1,73 @@
+"""
+Measures encode speed of one clip with every 9:16 filter profile.
+
+Usage:
+    python benchmarks/filter_graph.py --seconds 90
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render import FILTER_PROFILES , background_filter
+from subtitle_fix import srt_to_ass
+from trim_render import make_clip_srt
+
+FPS = 30
+
+
+def render(workdir, profile, seconds):
+    source = os.path.join(workdir, "clip.mp4")
+    srt_file = os.path.join(workdir, "clip.srt")
+    ass_file = srt_file + "-.ass"
+    make_clip_srt(srt_file, 0, seconds)
+    srt_to_ass(srt_file, ass_file)
+    output = os.path.join(workdir, f"{profile}.mp4")
+
+    command = [
+        "ffmpeg", "-y", "-i", source,
+        "-filter_complex", background_filter(ass_file, "0:v", "vout", profile=profile),
+        "-map", "[vout]", "-map", "0:a?", output
+    ]
+    started = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    wall = time.perf_counter() - started
+
+    reported = re.findall(r"fps=\s*([\d.]+)", process.stderr)
+    probe = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "v:0",
+                            "-show_entries", "stream=width,height", "-of", "csv=p=0", output],
+                           capture_output=True, text=True, check=True)
+    return {
+        "wall_seconds": round(wall, 3),
+        "fps": round(seconds * FPS / wall, 2),
+        "ffmpeg_fps": float(reported[-1]) if reported else None,
+        "resolution": probe.stdout.strip(),
+        "bytes": os.path.getsize(output),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=90)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="podpilot-bench-")
+    try:
+        subprocess.run([
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc=size=1920x1080:rate={FPS}:duration={args.seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={args.seconds}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest",
+            os.path.join(workdir, "clip.mp4")
+        ], check=True)
+        results = {profile: render(workdir, profile, args.seconds) for profile in FILTER_PROFILES}
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
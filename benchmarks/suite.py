@@ -0,0 +1,233 @@
+"""
+Offline benchmark of the chunk -> extract -> render path , no YouTube or Gemini needed.
+
+For every podcast length a synthetic transcript with rolling auto caption cues is generated
+and run through the chunkers , a deterministic fake of the moments LLM and the subtitle
+extraction. Unless --skip-media is given a synthetic video (testsrc plus a tone) of the same
+length is generated and the clips are trimmed and rendered with the ffmpeg helpers.
+
+The results are written to a JSON baseline , --compare checks a run against an older one.
+
+Usage:
+    python benchmarks/suite.py --minutes 30,60,120,240 --output benchmarks/baseline.json
+    python benchmarks/suite.py --minutes 30,60 --skip-media --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunking import Transcript , chunk_srt_by_chars , iter_transcript_chunks , normalize_auto_captions , extract_srt_segment , dedupe_moments , format_srt_time
+from constants import MODEL_CHUNK_TOKENS , CHUNK_OVERLAP_SECONDS
+from ratelimit import batch_with_limiter
+from schema import Moment , MomentsList
+
+WORDS = ("so the thing is nobody really talks about how hard it was when we started "
+         "the company and i remember sitting there at three in the morning thinking "
+         "this is never going to work but then something changed").split()
+
+
+def make_rolling_srt(path, seconds):
+    """
+    Auto caption style SRT: a cue every ~1.7s whose first line repeats the second line of
+    the cue before it , like the rolling captions YouTube generates.
+    """
+    with open(path, "w", encoding="utf-8") as fp:
+        t, i, w = 0, 1, 0
+        previous = ""
+        while t < seconds * 1000:
+            line = " ".join(WORDS[(w + k) % len(WORDS)] for k in range(7))
+            w += 7
+            text = f"{previous}\n{line}" if previous else line
+            fp.write(f"{i}\n{format_srt_time(t)} --> {format_srt_time(t + 1700)}\n{text}\n\n")
+            previous = line
+            t += 1700
+            i += 1
+
+
+class FakeMomentsLLM:
+    """
+    Deterministic stand-in for the moments chain , picks clips at fixed positions of every chunk.
+    """
+
+    def __init__(self, clips_per_chunk=3, clip_seconds=60, latency=0.0):
+        self.clips_per_chunk = clips_per_chunk
+        self.clip_seconds = clip_seconds
+        self.latency = latency
+
+    def invoke(self, inputs):
+        if self.latency:
+            time.sleep(self.latency)
+        stamps = re.findall(r"(\d\d:\d\d:\d\d,\d\d\d) -->", inputs["transcript"])
+        moments = []
+        for k in range(self.clips_per_chunk):
+            start = stamps[len(stamps) * (k + 1) // (self.clips_per_chunk + 1)]
+            h, m, rest = start.split(":")
+            s, ms = rest.split(",")
+            start_ms = ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + int(ms)
+            moments.append(Moment(
+                reason="synthetic",
+                start_time=start,
+                end_time=format_srt_time(start_ms + self.clip_seconds * 1000),
+                title=f"clip {k}",
+                description="synthetic clip",
+                keywords=["benchmark"],
+            ))
+        return MomentsList(Moments=moments)
+
+
+def timed(fn, *args, repeat=1, **kwargs):
+    """
+    Result of fn and its best wall time out of `repeat` runs.
+    """
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, round(best, 4)
+
+
+def bench_transcript(workdir, seconds, args):
+    srt_path = os.path.join(workdir, "podcast.srt")
+    make_rolling_srt(srt_path, seconds)
+    result = {"srt_bytes": os.path.getsize(srt_path)}
+
+    transcript, result["parse_seconds"] = timed(Transcript.from_srt, srt_path, repeat=args.repeat)
+    result["cues"] = len(transcript)
+    normalized, result["normalize_seconds"] = timed(normalize_auto_captions, transcript, repeat=args.repeat)
+    result["normalized_cues"] = len(normalized)
+
+    chunks, result["chunk_srt_by_chars_seconds"] = timed(chunk_srt_by_chars, normalized, repeat=args.repeat)
+    result["chunk_srt_by_chars_chunks"] = len(chunks)
+
+    max_tokens = MODEL_CHUNK_TOKENS["gemini-2.0-flash"]
+    chunks, result["iter_transcript_chunks_seconds"] = timed(
+        lambda: list(iter_transcript_chunks(normalized, max_tokens, overlap_seconds=CHUNK_OVERLAP_SECONDS)), repeat=args.repeat)
+    result["iter_transcript_chunks_chunks"] = len(chunks)
+
+    llm = FakeMomentsLLM(clip_seconds=args.clip_seconds, latency=args.llm_latency)
+    inputs = ({"podcast_title": "bench", "podcast_description": "bench", "transcript": chunk["srt_text"]}
+              for chunk in iter_transcript_chunks(normalized, max_tokens, overlap_seconds=CHUNK_OVERLAP_SECONDS))
+    results, result["extract_moments_seconds"] = timed(batch_with_limiter, llm, inputs, None, 4)
+    moments = dedupe_moments([moment for r in results for moment in r.Moments])
+    result["moments"] = len(moments)
+
+    _, result["extract_srt_segment_seconds"] = timed(
+        lambda: [extract_srt_segment(normalized, moment.start_time, moment.end_time) for moment in moments],
+        repeat=args.repeat)
+    return result, moments
+
+
+def bench_media(workdir, seconds, moments, args, result):
+    # Imported here so the transcript part runs without the langchain dependencies of tools
+    from tools import trim_media , convert_and_add_captions
+    from chunking import save_srt
+
+    source = os.path.join(workdir, "source.mp4")
+    _, result["make_source_seconds"] = timed(subprocess.run, [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", "300",
+        "-c:a", "aac", "-shortest", source
+    ], check=True)
+
+    trim, render = 0.0, 0.0
+    for i, moment in enumerate(moments[:args.clips]):
+        srt_file = os.path.join(workdir, f"{i}_subs.srt")
+        subs = extract_srt_segment(os.path.join(workdir, "podcast.srt"), moment.start_time, moment.end_time)
+        save_srt(subs, srt_file)
+        trimmed = os.path.join(workdir, f"{i}_index.mp4")
+        _, seconds_taken = timed(trim_media, {"input_file": source, "output_file": trimmed,
+                                              "start_time": moment.start_time.replace(",", "."),
+                                              "end_time": moment.end_time.replace(",", ".")})
+        trim += seconds_taken
+        _, seconds_taken = timed(convert_and_add_captions, trimmed, srt_file, os.path.join(workdir, f"{i}_final.mp4"))
+        render += seconds_taken
+    result["trim_media_seconds"] = round(trim, 3)
+    result["convert_and_add_captions_seconds"] = round(render, 3)
+    os.remove(source)
+
+
+def compare(baseline, current, threshold):
+    """
+    Prints every `*_seconds` timing that got slower than `threshold` times the baseline.
+
+    Returns:
+        number of regressions
+    """
+    regressions = 0
+    for length, results in current["results"].items():
+        old = baseline["results"].get(length, {})
+        for key, value in results.items():
+            if not key.endswith("_seconds") or not old.get(key):
+                continue
+            ratio = value / old[key]
+            flag = "REGRESSION" if ratio > threshold else ""
+            regressions += bool(flag)
+            print(f"{length:>5} min  {key:<36} {old[key]:>10.4f} -> {value:>10.4f}  x{ratio:.2f} {flag}")
+    return regressions
+
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", default="30,60,120,240", help="Podcast lengths , comma separated")
+    parser.add_argument("--clips", type=int, default=3, help="Clips trimmed and rendered per length")
+    parser.add_argument("--clip-seconds", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of every transcript step , the best one counts")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds every fake LLM call sleeps")
+    parser.add_argument("--skip-media", action="store_true", help="Only benchmark the transcript path")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json"))
+    parser.add_argument("--compare", help="Baseline JSON to compare this run with")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    report = {
+        "revision": revision(),
+        "created_at": time.time(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "options": {"repeat": args.repeat, "clips": args.clips, "clip_seconds": args.clip_seconds, "llm_latency": args.llm_latency,
+                    "media": not args.skip_media},
+        "results": {},
+    }
+    for minutes in [float(m) for m in args.minutes.split(",")]:
+        workdir = tempfile.mkdtemp(prefix="podpilot-bench-")
+        try:
+            seconds = int(minutes * 60)
+            started = time.perf_counter()
+            result, moments = bench_transcript(workdir, seconds, args)
+            if not args.skip_media:
+                bench_media(workdir, seconds, moments, args, result)
+            report["results"][f"{minutes:g}"] = result
+            print(f"{minutes:g} min done in {time.perf_counter() - started:.1f}s")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report["results"], indent=2))
+    if args.compare:
+        with open(args.compare) as fp:
+            regressions = compare(json.load(fp), report, args.threshold)
+        print(f"{regressions} regressions")
+    with open(args.output, "w") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare and regressions:
+        sys.exit(1)
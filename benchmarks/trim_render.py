@@ -0,0 +1,84 @@
+"""
+Compares the two step trim (stream copy) + render path with the direct render path
+that seeks inside the final encode.
+
+Usage:
+    python benchmarks/trim_render.py --minutes 20 --clips 3 --clip-seconds 90
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import trim_media , convert_and_add_captions
+from chunking import format_srt_time
+
+
+def make_source(path, seconds):
+    """
+    Synthetic 1080p podcast , testsrc video with a sine tone and a keyframe every 10 seconds.
+    """
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size=1920x1080:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", "300",
+        "-c:a", "aac", "-shortest", path
+    ], check=True)
+
+
+def make_clip_srt(path, start, end):
+    with open(path, "w", encoding="utf-8") as fp:
+        t, i = start, 1
+        while t < end:
+            fp.write(f"{i}\n{format_srt_time(t * 1000)} --> {format_srt_time(min(t + 2, end) * 1000)}\nsynthetic caption {i}\n\n")
+            t += 2
+            i += 1
+
+
+def run(workdir, clips, direct):
+    source = os.path.join(workdir, "source.mp4")
+    written = 0
+    started = time.perf_counter()
+    for i, (start, end) in enumerate(clips):
+        srt_file = os.path.join(workdir, f"{i}_subs.srt")
+        make_clip_srt(srt_file, start, end)
+        output = os.path.join(workdir, f"{i}_final.mp4")
+        if direct:
+            convert_and_add_captions(source, srt_file, output, start_time=format_srt_time(start * 1000), end_time=format_srt_time(end * 1000))
+        else:
+            trimmed = os.path.join(workdir, f"{i}_index.mp4")
+            trim_media({"input_file": source, "output_file": trimmed,
+                        "start_time": str(start), "end_time": str(end)})
+            convert_and_add_captions(trimmed, srt_file, output)
+            written += os.path.getsize(trimmed)
+        written += os.path.getsize(output)
+    return {"wall_seconds": round(time.perf_counter() - started, 3), "bytes_written": written}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=20)
+    parser.add_argument("--clips", type=int, default=3)
+    parser.add_argument("--clip-seconds", type=float, default=90)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="podpilot-bench-")
+    try:
+        make_source(os.path.join(workdir, "source.mp4"), int(args.minutes * 60))
+        step = args.minutes * 60 / (args.clips + 1)
+        # Starts deliberately off the 10 second keyframe grid
+        clips = [(step * (i + 1) + 3.37, step * (i + 1) + 3.37 + args.clip_seconds) for i in range(args.clips)]
+        results = {
+            "two_step": run(workdir, clips, direct=False),
+            "direct": run(workdir, clips, direct=True),
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
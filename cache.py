@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from ratelimit import estimate_tokens
+import metrics
+
+
+class SQLiteLRUCache:
+    """
+    Small persistent key/value cache stored in a SQLite table.
+
+    Entries older than `ttl` seconds are treated as missing and once the table grows
+    past `max_entries` the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: str, table: str, ttl: float = None, max_entries: int = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)")
+
+    def get(self, key: str):
+        """
+        Returns the stored value or None when the key is missing or expired.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        if self.ttl is not None:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,))
+        if self.max_entries is not None:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class MetadataCache(SQLiteLRUCache):
+    """
+    Caches the parts of the yt-dlp video info we use , keyed by video id.
+    """
+
+    def __init__(self, path: str, ttl: float = None, max_entries: int = None):
+        super().__init__(path, "video_metadata", ttl=ttl, max_entries=max_entries)
+
+    def get_video(self, video_id: str):
+        """
+        Returns dict with `description` , `caption_langs` and `publish_time` or None on a miss.
+        """
+        value = self.get(video_id)
+        return json.loads(value) if value is not None else None
+
+    def set_video(self, video_id: str, info: dict):
+        """
+        Stores the metadata of a video from the full yt-dlp info dict.
+        """
+        self.set(video_id, json.dumps({
+            "description": info.get("description"),
+            "caption_langs": list(info.get("automatic_captions", {}) or {}),
+            "publish_time": info.get("timestamp") or info.get("upload_date"),
+        }))
+
+
+class LLMResponseCache(SQLiteLRUCache):
+    """
+    Content addressed cache of parsed structured outputs of the LLM.
+    """
+
+    def __init__(self, path: str, ttl: float = None, max_entries: int = None):
+        super().__init__(path, "llm_responses", ttl=ttl, max_entries=max_entries)
+
+
+class CachedStructuredChain:
+    """
+    Wraps `prompt | llm.with_structured_output(schema)` and caches the parsed result.
+
+    The cache key is a hash of the model name , the model kwargs , the rendered prompt
+    and the json schema of the output , so any change to one of them is a miss.
+    """
+
+    def __init__(self, prompt, llm, schema, cache: LLMResponseCache, model_name: str, model_kwargs: dict = None, limiter=None):
+        self.prompt = prompt
+        self.schema = schema
+        self.cache = cache
+        self.model_name = model_name
+        self.model_kwargs = model_kwargs or {}
+        self.limiter = limiter
+        self.structured_llm = llm.with_structured_output(schema)
+
+    def cache_key(self, prompt_text: str) -> str:
+        payload = json.dumps({
+            "model": self.model_name,
+            "model_kwargs": self.model_kwargs,
+            "prompt": prompt_text,
+            "schema": self.schema.model_json_schema(),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def invoke(self, inputs: dict):
+        """
+        Returns the cached parsed object for the rendered prompt or calls the LLM on a miss.
+        Only misses take capacity from the rate limiter.
+        """
+        prompt_value = self.prompt.invoke(inputs)
+        prompt_text = prompt_value.to_string()
+        key = self.cache_key(prompt_text)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            metrics.add("llm_cache_hits")
+            return self.schema.model_validate_json(cached)
+
+        tokens_in = estimate_tokens(prompt_text)
+        if self.limiter is not None:
+            self.limiter.acquire(tokens_in)
+        with metrics.track("llm"):
+            result = self.structured_llm.invoke(prompt_value)
+        metrics.add("llm_tokens_in", tokens_in)
+        if result is not None:
+            result_json = result.model_dump_json()
+            metrics.add("llm_tokens_out", estimate_tokens(result_json))
+            self.cache.set(key, result_json)
+        return result
@@ -0,0 +1,237 @@
+"""
+Crash safe cycles.
+
+The graph state is checkpointed in SQLite after every node , so a run that crashed resumes at
+the node that failed instead of searching , downloading and prompting again. The rendered and
+uploaded clips are tracked next to it so a resumed node skips the clips it already finished.
+
+Every selected podcast is claimed by its run , so overlapping cron runs and the cycles of one
+process never work on the same podcast (and the same workspace) at once.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from constants import CHECKPOINT_PATH, CHECKPOINT_MAX_RESUMES
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def get_checkpointer(path: str = CHECKPOINT_PATH) -> SqliteSaver:
+    """
+    SQLite checkpointer of the graph.
+
+    The Transcript keeps its cues in arrays that msgpack can not encode , those are pickled.
+    """
+    return SqliteSaver(_connect(path), serde=JsonPlusSerializer(pickle_fallback=True))
+
+
+def _alive(pid) -> bool:
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _holds(pid) -> bool:
+    # A claim of this process belongs to one of its running cycles
+    return pid == os.getpid() or _alive(pid)
+
+
+class ArtifactStore:
+    """
+    Remembers which clips of a podcast were rendered or uploaded.
+
+    A rendered clip only counts while its file is still on disk with the recorded size ,
+    so a half written or deleted file is rendered again.
+    """
+
+    RENDERED = "rendered"
+    UPLOADED = "uploaded"
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "video_id TEXT NOT NULL, clip INTEGER NOT NULL, kind TEXT NOT NULL, "
+                "path TEXT NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (video_id, clip, kind))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "thread_id TEXT PRIMARY KEY, resumes INTEGER NOT NULL DEFAULT 0, finished INTEGER NOT NULL DEFAULT 0, "
+                "pid INTEGER, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS claims ("
+                "video_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL, pid INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS claims_thread ON claims(thread_id)")
+
+    def record(self, video_id: str, clip: int, kind: str, path: str):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (video_id, clip, kind, path, size, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, clip, kind, path, size, time.time()),
+            )
+
+    def done(self, video_id: str, kind: str) -> set:
+        """
+        Clip indexes of the podcast already finished for `kind`.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT clip, path, size FROM artifacts WHERE video_id = ? AND kind = ?", (video_id, kind)
+            ).fetchall()
+        if kind != self.RENDERED:
+            return {clip for clip, _, _ in rows}
+        return {clip for clip, path, size in rows if os.path.exists(path) and os.path.getsize(path) == size}
+
+    def clear(self, video_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM artifacts WHERE video_id = ?", (video_id,))
+
+    def claimed(self, video_ids) -> set:
+        """
+        The ids out of `video_ids` claimed by a live run , of this process or of another one.
+        """
+        video_ids = list(video_ids)
+        if not video_ids:
+            return set()
+        placeholders = ",".join("?" * len(video_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT video_id, pid FROM claims WHERE video_id IN ({placeholders})", video_ids
+            ).fetchall()
+        return {video_id for video_id, pid in rows if _holds(pid)}
+
+    def claim(self, video_id: str, thread_id: str) -> bool:
+        """
+        Claims a podcast for a run. A claim left by a dead process is taken over.
+
+        Returns:
+            False when another live run holds the podcast
+        """
+        with self._lock, self._conn:
+            # Takes the write lock before reading , two processes can not both see the podcast free
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT thread_id, pid FROM claims WHERE video_id = ?", (video_id,)).fetchone()
+            if row is not None and row[0] != thread_id and _holds(row[1]):
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO claims (video_id, thread_id, pid, created_at) VALUES (?, ?, ?, ?)",
+                (video_id, thread_id, os.getpid(), time.time()),
+            )
+            return True
+
+    def release(self, video_id: str = None, thread_id: str = None):
+        """
+        Drops the claim on a podcast , or every claim of a run.
+        """
+        with self._lock, self._conn:
+            if video_id is not None:
+                self._conn.execute("DELETE FROM claims WHERE video_id = ?", (video_id,))
+            if thread_id is not None:
+                self._conn.execute("DELETE FROM claims WHERE thread_id = ?", (thread_id,))
+
+    def open_runs(self):
+        """
+        (thread_id , resumes) of the runs not finished yet , oldest first.
+        Runs still owned by another live process (an overlapping cron run) are left out.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, resumes, pid FROM runs WHERE finished = 0 ORDER BY created_at"
+            ).fetchall()
+        return [(thread_id, resumes) for thread_id, resumes, pid in rows if not _alive(pid)]
+
+    def finish_run(self, thread_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET finished = 1, updated_at = ? WHERE thread_id = ?", (time.time(), thread_id)
+            )
+
+    def new_run(self) -> str:
+        thread_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (thread_id, pid, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (thread_id, os.getpid(), now, now)
+            )
+        return thread_id
+
+    def count_resume(self, thread_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET resumes = resumes + 1, pid = ?, updated_at = ? WHERE thread_id = ?",
+                (os.getpid(), time.time(), thread_id)
+            )
+
+
+def close_run(app, artifacts: ArtifactStore, thread_id: str):
+    """
+    Marks a run finished , releases its podcast and deletes its checkpoints. They hold the whole
+    state after every node , the parsed transcript included , so a finished or abandoned thread is never kept.
+    """
+    artifacts.finish_run(thread_id)
+    artifacts.release(thread_id=thread_id)
+    app.checkpointer.delete_thread(thread_id)
+
+
+def plan_runs(app, artifacts: ArtifactStore, count: int = 1, max_resumes: int = CHECKPOINT_MAX_RESUMES,
+              on_give_up=None):
+    """
+    Picks the runs to start now , the ones that crashed before END come first.
+
+    A crashed run is given up after `max_resumes` resumes , `on_give_up(video_id)` then cleans up
+    after the podcast it was working on. Crashed runs beyond `count` wait for the next start.
+
+    Returns:
+        list of (config , resume) , resume is True when the graph continues the run from its
+        checkpoint and is invoked with None
+    """
+    runs = []
+    for thread_id, resumes in artifacts.open_runs():
+        config = {"configurable": {"thread_id": thread_id}}
+        snapshot = app.get_state(config)
+        if not snapshot.next:
+            close_run(app, artifacts, thread_id)
+            continue
+        if resumes >= max_resumes:
+            print(f"GIVING UP ON RUN {thread_id} AFTER {resumes} RESUMES")
+            video_id = (snapshot.values.get("podcast") or {}).get("video_id")
+            # A podcast another live run took over keeps its workspace
+            if video_id and on_give_up is not None and artifacts.claim(video_id, thread_id):
+                on_give_up(video_id)
+            close_run(app, artifacts, thread_id)
+            continue
+        if len(runs) < count:
+            artifacts.count_resume(thread_id)
+            print(f"RESUMING RUN {thread_id} AT {', '.join(snapshot.next)} (attempt {resumes + 1})")
+            runs.append((config, True))
+
+    while len(runs) < count:
+        runs.append(({"configurable": {"thread_id": artifacts.new_run()}}, False))
+    return runs
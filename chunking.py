@@ -1,20 +1,93 @@
-
-from langchain_core.documents import Document
+from array import array
+from bisect import bisect_left, bisect_right
 import pysrt
 import os
+import re
+from ratelimit import estimate_tokens
+
+
+def format_srt_time(ms):
+    """
+    Formats milliseconds as an SRT timestamp 'HH:MM:SS,mmm' , negative times are clamped to zero.
+    """
+    ms = max(0, int(round(ms)))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+class Transcript:
+    """
+    A transcript parsed once and kept in compact storage: cue start/end times as
+    integer millisecond arrays plus a list of the cue texts, sorted by start time.
+    """
+
+    def __init__(self, starts, ends, texts, path=None):
+        self.starts = array('q', starts)
+        self.ends = array('q', ends)
+        self.texts = list(texts)
+        self.path = path
+
+    @classmethod
+    def from_srt(cls, srt_path):
+        """
+        Parses an .srt file into a Transcript.
+
+        :param srt_path: Path to the .srt file
+        """
+        subs = sorted(pysrt.open(srt_path), key=lambda sub: sub.start.ordinal)
+        return cls(
+            (sub.start.ordinal for sub in subs),
+            (sub.end.ordinal for sub in subs),
+            (sub.text for sub in subs),
+            path=srt_path,
+        )
+
+    def __len__(self):
+        return len(self.texts)
+
+    def cue_range(self, start_ms, end_ms):
+        """
+        Index range (lo, hi) of the cues starting between start_ms and end_ms (both inclusive).
+        """
+        return bisect_left(self.starts, start_ms), bisect_right(self.starts, end_ms)
+
+    def item(self, i):
+        """
+        The i-th cue as a pysrt.SubRipItem.
+        """
+        return pysrt.SubRipItem(
+            index=i + 1,
+            start=pysrt.SubRipTime.from_ordinal(self.starts[i]),
+            end=pysrt.SubRipTime.from_ordinal(self.ends[i]),
+            text=self.texts[i],
+        )
+
+    def entry_text(self, i):
+        """
+        The i-th cue in SRT format.
+        """
+        return f"{i + 1}\n{format_srt_time(self.starts[i])} --> {format_srt_time(self.ends[i])}\n{self.texts[i]}"
+
+
+def load_transcript(transcript):
+    """
+    Returns the given Transcript or parses it when a path to an .srt file is given.
+    """
+    return transcript if isinstance(transcript, Transcript) else Transcript.from_srt(transcript)
+
+
 def chunk_srt_by_chars(srt_path, max_chars=70000):
-    subs = pysrt.open(srt_path)
+    transcript = load_transcript(srt_path)
     chunks = []
     current_chunk = []
     current_char_count = 0
 
-    for sub in subs:
-        entry_text = f"{sub.index}\n{sub.start} --> {sub.end}\n{sub.text}\n\n"
+    for i in range(len(transcript)):
+        entry_text = transcript.entry_text(i) + "\n\n"
         if current_char_count + len(entry_text) > max_chars and current_chunk:
             chunks.append(current_chunk)
             current_chunk = []
             current_char_count = 0
-        current_chunk.append(sub)
+        current_chunk.append(i)
         current_char_count += len(entry_text)
 
     if current_chunk:
@@ -23,41 +96,260 @@ def chunk_srt_by_chars(srt_path, max_chars=70000):
     # Prepare clean export format
     result = []
     for i, chunk in enumerate(chunks):
-        chunk_text = "\n".join(
-            f"{sub.index}\n{sub.start} --> {sub.end}\n{sub.text}" for sub in chunk
-        )
+        chunk_text = "\n".join(transcript.entry_text(j) for j in chunk)
         result.append({
             "chunk_index": i,
-            "start_time": str(chunk[0].start),
-            "end_time": str(chunk[-1].end),
+            "start_time": format_srt_time(transcript.starts[chunk[0]]),
+            "end_time": format_srt_time(transcript.ends[chunk[-1]]),
             "srt_text": chunk_text
         })
 
     return result
 
+def strip_rolling_overlap(previous, text):
+    """
+    Removes the words of a cue that only repeat the end of the previous cue ,
+    as YouTube auto captions roll every line through two or more cues.
+
+    A single repeated word only counts when it is the whole previous or current cue ,
+    so natural repetitions in speech are kept.
+
+    :param previous: Text of the previous cue
+    :param text: Text of the current cue
+    :return: The new words of the cue , empty when it only repeats
+    """
+    previous_words = previous.split()[-64:]
+    words = text.split()
+    k = min(len(previous_words), len(words))
+    while k > 0:
+        if previous_words[-k:] == words[:k] and (k >= 2 or k == len(words) or k == len(previous_words)):
+            break
+        k -= 1
+    return " ".join(words[k:])
+
+
+_WORD_TIME_TAG = re.compile(r"<(\d{2}):(\d{2}):(\d{2})[.,](\d{3})>")
+_STYLE_TAG = re.compile(r"</?c[^>]*>")
+
+
+def _timed_words(text, start_ms):
+    """
+    Splits a cue into (word, start_ms) pairs using the inline `<HH:MM:SS.mmm>` word timing
+    of auto captions when present , words before the first tag start with the cue.
+    """
+    text = _STYLE_TAG.sub("", text)
+    words = []
+    current = start_ms
+    position = 0
+    for match in _WORD_TIME_TAG.finditer(text):
+        words += [(word, current) for word in text[position:match.start()].split()]
+        h, m, s, ms = (int(g) for g in match.groups())
+        current = ((h * 60 + m) * 60 + s) * 1000 + ms
+        position = match.end()
+    words += [(word, current) for word in text[position:].split()]
+    return words
+
+
+def normalize_auto_captions(transcript):
+    """
+    Collapses the rolling duplicates of YouTube auto captions into clean cues.
+
+    Every cue keeps only the words it adds to the previous one , cues adding nothing are
+    dropped and a cue starts at the timing of its first new word when word timing is present.
+    Cue ends are clipped to the start of the next cue so captions never stack.
+
+    :param transcript: Transcript or path to the .srt file
+    :return: A new Transcript with the clean cues
+    """
+    transcript = load_transcript(transcript)
+    starts, ends, texts = [], [], []
+    previous = ""
+    for i in range(len(transcript)):
+        words = _timed_words(transcript.texts[i], transcript.starts[i])
+        plain = " ".join(word for word, _ in words)
+        new_text = strip_rolling_overlap(previous, plain)
+        previous = plain
+        if not new_text:
+            continue
+        new_words = words[len(words) - len(new_text.split()):]
+        # Keep the starts sorted for the bisect lookups
+        starts.append(max(new_words[0][1], transcript.starts[i], starts[-1] if starts else 0))
+        ends.append(transcript.ends[i])
+        texts.append(new_text)
+
+    for i in range(len(starts) - 1):
+        if starts[i] < starts[i + 1] < ends[i]:
+            ends[i] = starts[i + 1]
+    return Transcript(starts, ends, texts, path=transcript.path)
+
+
+def format_compact(transcript, lo, hi, min_cue_ms=4000):
+    """
+    Compact prompt format of the cues lo..hi , one `[offset] text` line per merged cue group.
+
+    Offsets are whole seconds since the first cue of the chunk , rolling duplicates are
+    dropped and consecutive cues are merged until a group lasts `min_cue_ms`.
+    """
+    base = transcript.starts[lo]
+    lines = []
+    previous = transcript.texts[lo - 1] if lo > 0 else ""
+    group_start = None
+    words = []
+    for i in range(lo, hi):
+        new_text = strip_rolling_overlap(previous, transcript.texts[i])
+        previous = transcript.texts[i]
+        if not new_text:
+            continue
+        if group_start is None:
+            group_start = transcript.starts[i]
+        words.append(new_text.replace("\n", " "))
+        if transcript.ends[i] - group_start >= min_cue_ms:
+            lines.append(f"[{(group_start - base) // 1000}] {' '.join(words)}")
+            group_start = None
+            words = []
+    if words:
+        lines.append(f"[{(group_start - base) // 1000}] {' '.join(words)}")
+    return "\n".join(lines)
+
+
+def decode_compact_span(transcript, chunk_start_ms, start_offset, end_offset):
+    """
+    Maps the second offsets the model returned for a compact chunk back to exact SRT times.
+
+    The start snaps to the nearest cue start and the end to the end of the cue it falls in.
+
+    :param transcript: Transcript the chunk was made from
+    :param chunk_start_ms: Start of the chunk in milliseconds
+    :param start_offset: Start of the moment in seconds since the chunk start
+    :param end_offset: End of the moment in seconds since the chunk start
+    :return: (start_time, end_time) as SRT timestamps
+    """
+    starts = transcript.starts
+    start_ms = chunk_start_ms + int(float(start_offset) * 1000)
+    end_ms = chunk_start_ms + int(float(end_offset) * 1000)
+
+    i = bisect_left(starts, start_ms)
+    if i == len(starts) or (i > 0 and start_ms - starts[i - 1] <= starts[i] - start_ms):
+        i -= 1
+    j = max(i, bisect_right(starts, end_ms) - 1)
+    return format_srt_time(starts[i]), format_srt_time(max(transcript.ends[j], starts[i]))
+
+
+def iter_transcript_chunks(transcript, max_tokens, overlap_seconds=0, text_format="srt"):
+    """
+    Lazily yields transcript chunks sized by an estimated token budget.
+
+    Consecutive chunks share the last `overlap_seconds` of cues so a moment crossing a
+    chunk boundary is still seen whole by one of them. The overlap never covers more
+    than half of a chunk.
+
+    :param transcript: Transcript or path to the .srt file
+    :param max_tokens: Estimated token budget of the transcript text of one chunk
+    :param overlap_seconds: Seconds of transcript repeated at the start of the next chunk
+    :param text_format: "srt" for plain SRT entries or "compact" for `format_compact` lines
+    :return: Generator of dicts with chunk_index, start_time, end_time, start_ms and
+        srt_text (the chunk text in the requested format)
+    """
+    transcript = load_transcript(transcript)
+    overlap_ms = int(overlap_seconds * 1000)
+    n = len(transcript)
+    lo = 0
+    chunk_index = 0
+
+    while lo < n:
+        hi = lo
+        tokens = 0
+        previous = transcript.texts[lo - 1] if lo > 0 else ""
+        while hi < n:
+            if text_format == "compact":
+                # New words plus the offset marker
+                cost = estimate_tokens(strip_rolling_overlap(previous, transcript.texts[hi])) + 1
+                previous = transcript.texts[hi]
+            else:
+                cost = estimate_tokens(transcript.entry_text(hi))
+            if tokens + cost > max_tokens and hi > lo:
+                break
+            tokens += cost
+            hi += 1
+
+        if text_format == "compact":
+            text = format_compact(transcript, lo, hi)
+        else:
+            text = "\n".join(transcript.entry_text(i) for i in range(lo, hi))
+        yield {
+            "chunk_index": chunk_index,
+            "start_time": format_srt_time(transcript.starts[lo]),
+            "end_time": format_srt_time(transcript.ends[hi - 1]),
+            "start_ms": transcript.starts[lo],
+            "srt_text": text
+        }
+        chunk_index += 1
+        if hi >= n:
+            break
+        lo = max(bisect_left(transcript.starts, transcript.starts[hi] - overlap_ms), (lo + hi + 1) // 2)
+
+
+def dedupe_moments(moments, min_overlap=0.5):
+    """
+    Drops moments that repeat an earlier one , as found twice by overlapping chunks.
+
+    :param moments: Moments in chunk order
+    :param min_overlap: Share of the shorter moment two moments must overlap to count as the same
+    :return: List of the moments that were kept , in the original order
+    """
+    kept = []
+    spans = []
+    for moment in moments:
+        start = pysrt.SubRipTime.from_string(moment.start_time).ordinal
+        end = pysrt.SubRipTime.from_string(moment.end_time).ordinal
+        duplicate = False
+        for kept_start, kept_end in spans:
+            overlap = min(end, kept_end) - max(start, kept_start)
+            shorter = max(1, min(end - start, kept_end - kept_start))
+            if overlap / shorter >= min_overlap:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(moment)
+            spans.append((start, end))
+    return kept
+
+
 def extract_srt_segment(srt_path, start_time_str, end_time_str):
     """
-    Extracts subtitles between start_time and end_time from an SRT file.
+    Extracts subtitles between start_time and end_time from a transcript.
 
-    :param srt_path: Path to the .srt file
+    :param srt_path: Transcript or path to the .srt file
     :param start_time_str: Start timestamp as string, e.g., "00:12:00,000"
     :param end_time_str: End timestamp as string, e.g., "00:15:30,000"
     :return: List of pysrt.SubRipItem objects within the range
     """
-    subs = pysrt.open(srt_path)
+    transcript = load_transcript(srt_path)
     start = pysrt.SubRipTime.from_string(start_time_str)
     end = pysrt.SubRipTime.from_string(end_time_str)
 
-    selected = [sub for sub in subs if start <= sub.start <= end]
+    lo, hi = transcript.cue_range(start.ordinal, end.ordinal)
+    selected = [transcript.item(i) for i in range(lo, hi)]
 
     return selected
-def save_srt(subs, output_path):
+def save_srt(subs, output_path, shift_ms=0):
     """
     Saves a list of pysrt.SubRipItem objects to a new .srt file.
 
     :param subs: List of subtitle items
     :param output_path: Output path to save .srt file
+    :param shift_ms: Milliseconds subtracted from every timestamp , the input items are not modified
     """
+    if shift_ms:
+        subs = [
+            pysrt.SubRipItem(
+                index=sub.index,
+                start=pysrt.SubRipTime.from_ordinal(max(0, sub.start.ordinal - shift_ms)),
+                end=pysrt.SubRipTime.from_ordinal(max(0, sub.end.ordinal - shift_ms)),
+                text=sub.text,
+            )
+            for sub in subs
+        ]
     subrip_file = pysrt.SubRipFile(items=subs)
     subrip_file.clean_indexes()
     subrip_file.save(output_path, encoding='utf-8')
@@ -86,6 +378,9 @@ def chunk_transcription_data(segments, max_chunk_chars=200):
         list: A list of LangChain Document objects, each representing a chunk
               with updated metadata.
     """
+    # Only this helper needs langchain , importing it here keeps `import chunking` light
+    from langchain_core.documents import Document
+
     chunks = []
     current_chunk_text = []
     current_chunk_start_offset = None
@@ -7,3 +7,120 @@ ADD_CAPTIONS = "ADD_CAPTIONS"
 REPORT_ERROR = "REPORT_ERROR"
 CREATE_METADATA = "CREATE_METADATA"
 POST_VIDEO = "POST_VIDEO"
+DOWNLOAD_CLIPS = "DOWNLOAD_CLIPS"
+PIPELINE_CLIPS = "PIPELINE_CLIPS"
+
+import os
+
+# yt-dlp metadata lookups done in parallel while searching podcasts
+METADATA_FETCH_WORKERS = int(os.getenv("METADATA_FETCH_WORKERS", 8))
+METADATA_FETCH_TIMEOUT = float(os.getenv("METADATA_FETCH_TIMEOUT", 60))
+
+# On disk cache of yt-dlp video metadata , skips the subprocess on hits
+METADATA_CACHE_PATH = os.getenv("METADATA_CACHE_PATH", "./cache/metadata.sqlite")
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", 24 * 3600))
+METADATA_CACHE_MAX_ENTRIES = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", 5000))
+
+# Gemini quota , moment extraction runs chunks in parallel inside these limits
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 15))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 1_000_000))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+
+# Cache of parsed LLM responses , keyed on model , prompt and output schema
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./cache/llm.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 2000))
+
+# "per_clip" trims with stream copy then renders every clip , "direct" seeks inside the render
+# without a trimmed file , "single_pass" renders all clips with one ffmpeg run
+RENDER_MODE = os.getenv("RENDER_MODE", "per_clip")
+
+# Parallel clip encodes , workers = cpu count / threads per job capped by free memory
+RENDER_THREADS_PER_JOB = int(os.getenv("RENDER_THREADS_PER_JOB", 4))
+RENDER_JOB_MEMORY_MB = int(os.getenv("RENDER_JOB_MEMORY_MB", 1024))
+RENDER_MAX_WORKERS = int(os.getenv("RENDER_MAX_WORKERS", 0))
+
+# "legacy" full resolution gaussian blur , "fast" low resolution box blur with a fixed 720x1280 output
+FILTER_PROFILE = os.getenv("FILTER_PROFILE", "legacy")
+
+# Encoder settings of the clips , one of render.ENCODER_PROFILES ("fast" , "balanced" , "quality")
+RENDER_PROFILE = os.getenv("RENDER_PROFILE", "balanced")
+
+# "full" downloads the whole podcast , "sections" fetches subtitles first and only the chosen moments later
+DOWNLOAD_MODE = os.getenv("DOWNLOAD_MODE", "full")
+DOWNLOAD_SECTION_PADDING = float(os.getenv("DOWNLOAD_SECTION_PADDING", 5))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 3))
+
+# Transcript chunking for moment extraction , token budget per chunk by model and overlap between chunks
+MODEL_CHUNK_TOKENS = {
+    "gemini-2.0-flash": 32000,
+    "gemini-2.0-flash-lite": 32000,
+    "gemini-1.5-flash": 32000,
+    "gemini-1.5-pro": 48000,
+    "gemini-2.5-flash": 64000,
+    "gemini-2.5-pro": 64000,
+}
+DEFAULT_CHUNK_TOKENS = 17500
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 0))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", 150))
+
+# "srt" sends the transcript chunks as SRT , "compact" as `[offset] text` lines which need far fewer tokens
+TRANSCRIPT_FORMAT = os.getenv("TRANSCRIPT_FORMAT", "srt")
+
+# Collapse the rolling duplicates of YouTube auto captions right after download
+NORMALIZE_CAPTIONS = os.getenv("NORMALIZE_CAPTIONS", "true").lower() in ("1", "true", "yes")
+
+# Stream moments through download -> render -> upload instead of the staged EDIT_VIDEO / POST_VIDEO nodes
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "false").lower() in ("1", "true", "yes")
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 1))
+# Pause between two YouTube uploads
+UPLOAD_INTERVAL_SECONDS = float(os.getenv("UPLOAD_INTERVAL_SECONDS", 300))
+
+# "inline" uploads inside the graph , "queue" hands the clips to the persistent upload queue (python upload_queue.py)
+UPLOAD_MODE = os.getenv("UPLOAD_MODE", "inline")
+UPLOAD_QUEUE_PATH = os.getenv("UPLOAD_QUEUE_PATH", "./cache/uploads.sqlite")
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "./uploads")
+UPLOAD_DAILY_LIMIT = int(os.getenv("UPLOAD_DAILY_LIMIT", 0))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", 3))
+UPLOAD_RETRY_SECONDS = float(os.getenv("UPLOAD_RETRY_SECONDS", 900))
+YOUTUBE_CHANNEL = os.getenv("YOUTUBE_CHANNEL", "default")
+
+# In-process YouTube uploads , chunk size in MB (0 sends the file in one request) and parallel uploads
+UPLOAD_CHUNK_SIZE_MB = float(os.getenv("UPLOAD_CHUNK_SIZE_MB", 8))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", 2))
+
+# Graph checkpoints and clip artifacts , a crashed run is resumed at most CHECKPOINT_MAX_RESUMES times
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "./cache/checkpoints.sqlite")
+CHECKPOINT_MAX_RESUMES = int(os.getenv("CHECKPOINT_MAX_RESUMES", 3))
+
+# Podcasts get their own folder under DATA_DIR , CONCURRENT_PODCASTS of them are processed at once
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+CONCURRENT_PODCASTS = int(os.getenv("CONCURRENT_PODCASTS", 1))
+
+# Burnt podcast store , the legacy JSON list is imported into it once
+BURNT_PODCASTS_PATH = os.getenv("BURNT_PODCASTS_PATH", "./cache/burnt_podcasts.sqlite")
+BURNT_PODCASTS_JSON = os.getenv("BURNT_PODCASTS_JSON", "burnt_podcasts.json")
+
+# One JSON line per node and per cycle , METRICS_PORT serves Prometheus text on /metrics (0 disables)
+METRICS_PATH = os.getenv("METRICS_PATH", "./cache/metrics.jsonl")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+# Telegram notifications , repeats within NOTIFY_COALESCE_SECONDS are dropped and messages within NOTIFY_DIGEST_SECONDS are sent together
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "yout-bot-token-here")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "your-chat-id-here")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", 100))
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", 10))
+NOTIFY_COALESCE_SECONDS = float(os.getenv("NOTIFY_COALESCE_SECONDS", 600))
+NOTIFY_DIGEST_SECONDS = float(os.getenv("NOTIFY_DIGEST_SECONDS", 5))
+
+# python service.py runs a cycle every SERVICE_INTERVAL_SECONDS , +- SERVICE_JITTER_SECONDS
+SERVICE_INTERVAL_SECONDS = float(os.getenv("SERVICE_INTERVAL_SECONDS", 86400))
+SERVICE_JITTER_SECONDS = float(os.getenv("SERVICE_JITTER_SECONDS", 600))
+
+# Transcript sources in order (youtube , whisper) , the local ASR needs `pip install faster-whisper` , ASR_WORKERS=0 uses a worker per 4 cores
+TRANSCRIPT_PROVIDERS = os.getenv("TRANSCRIPT_PROVIDERS", "youtube,whisper")
+TRANSCRIPT_STORE_PATH = os.getenv("TRANSCRIPT_STORE_PATH", "./cache/transcripts.sqlite")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", 0))
+ASR_CHUNK_SECONDS = int(os.getenv("ASR_CHUNK_SECONDS", 60))
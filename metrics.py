@@ -0,0 +1,217 @@
+"""
+Where the time of a cycle goes.
+
+Every graph node is wrapped with `node` and every cycle with `cycle`. Both write one JSON line
+to METRICS_PATH when they finish , with the wall time , the CPU time of the child processes
+(yt-dlp , ffmpeg) , the peak RSS and the counters the helpers added meanwhile: bytes downloaded
+and written , LLM tokens , ffmpeg frames and the seconds spent in every kind of subprocess.
+
+Counters are process wide , with several podcasts running at once the numbers of a node also
+contain the work the other cycles did at the same time (like getrusage for child processes).
+
+With METRICS_PORT set the totals are served in the Prometheus text format on /metrics.
+"""
+import contextvars
+import functools
+import json
+import os
+import re
+import resource
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from constants import METRICS_PATH, METRICS_PORT
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_node_seconds = defaultdict(float)
+_node_runs = defaultdict(int)
+_current_cycle = contextvars.ContextVar("current_cycle", default=None)
+
+
+def add(name: str, value: float = 1):
+    """
+    Adds to a process wide counter.
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def add_file_size(name: str, *paths):
+    """
+    Adds the size of the files that exist out of `paths` to a byte counter.
+    """
+    add(name, sum(os.path.getsize(path) for path in paths if path and os.path.isfile(path)))
+
+
+@contextmanager
+def track(kind: str):
+    """
+    Counts the calls and seconds of one kind of work , ex `ffmpeg_render` or `ytdlp_download`.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(f"{kind}_seconds", time.perf_counter() - started)
+        add(f"{kind}_calls")
+
+
+def observe_ffmpeg(stderr: str):
+    """
+    Counts the frames ffmpeg reports in its progress output , ffmpeg_fps is derived from them.
+    """
+    frames = re.findall(r"frame=\s*(\d+)", stderr or "")
+    if frames:
+        add("ffmpeg_frames", int(frames[-1]))
+
+
+def _resources():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "child_cpu_seconds": children.ru_utime + children.ru_stime,
+        "cpu_seconds": own.ru_utime + own.ru_stime,
+        # ru_maxrss is in KB on Linux
+        "peak_rss_mb": round(own.ru_maxrss / 1024, 1),
+        "peak_child_rss_mb": round(children.ru_maxrss / 1024, 1),
+    }
+
+
+def _counters_copy():
+    with _lock:
+        return dict(_counters)
+
+
+def emit(record: dict):
+    """
+    Appends one JSON line to METRICS_PATH.
+    """
+    if not METRICS_PATH:
+        return
+    directory = os.path.dirname(METRICS_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    line = json.dumps(record, default=str)
+    with _lock:
+        with open(METRICS_PATH, "a") as fp:
+            fp.write(line + "\n")
+
+
+@contextmanager
+def measure(event: str, name: str):
+    """
+    Measures the block and emits it as one record.
+    """
+    counters = _counters_copy()
+    resources = _resources()
+    started_at = time.time()
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        wall = time.perf_counter() - started
+        now = _resources()
+        deltas = {
+            key: round(value - counters.get(key, 0), 3)
+            for key, value in _counters_copy().items()
+            if value != counters.get(key, 0)
+        }
+        if deltas.get("ffmpeg_frames") and deltas.get("ffmpeg_render_seconds"):
+            deltas["ffmpeg_fps"] = round(deltas["ffmpeg_frames"] / deltas["ffmpeg_render_seconds"], 2)
+        if event == "node":
+            with _lock:
+                _node_seconds[name] += wall
+                _node_runs[name] += 1
+        emit({
+            "event": event,
+            "name": name,
+            "cycle": _current_cycle.get(),
+            "status": status,
+            "started_at": started_at,
+            "wall_seconds": round(wall, 3),
+            "child_cpu_seconds": round(now["child_cpu_seconds"] - resources["child_cpu_seconds"], 3),
+            "cpu_seconds": round(now["cpu_seconds"] - resources["cpu_seconds"], 3),
+            "peak_rss_mb": now["peak_rss_mb"],
+            "peak_child_rss_mb": now["peak_child_rss_mb"],
+            **deltas,
+        })
+
+
+def node(name: str, fn):
+    """
+    Wraps a graph node so every run of it is measured.
+    """
+    @functools.wraps(fn)
+    def wrapper(state):
+        with measure("node", name):
+            return fn(state)
+    return wrapper
+
+
+@contextmanager
+def cycle(cycle_id: str):
+    """
+    Measures a whole cycle , the nodes run inside it are tagged with `cycle_id`.
+    """
+    token = _current_cycle.set(cycle_id)
+    try:
+        with measure("cycle", "cycle"):
+            yield
+    finally:
+        _current_cycle.reset(token)
+
+
+def prometheus_text() -> str:
+    """
+    The process totals in the Prometheus text exposition format.
+    """
+    lines = []
+    for key, value in sorted(_counters_copy().items()):
+        metric = f"podpilot_{key}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    with _lock:
+        nodes = sorted(_node_seconds.items())
+        runs = dict(_node_runs)
+    lines.append("# TYPE podpilot_node_seconds_total counter")
+    lines += [f'podpilot_node_seconds_total{{node="{name}"}} {seconds}' for name, seconds in nodes]
+    lines.append("# TYPE podpilot_node_runs_total counter")
+    lines += [f'podpilot_node_runs_total{{node="{name}"}} {runs[name]}' for name, _ in nodes]
+    for key, value in _resources().items():
+        lines += [f"# TYPE podpilot_{key} gauge", f"podpilot_{key} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = METRICS_PORT):
+    """
+    Serves /metrics from a daemon thread , does nothing when port is 0.
+    """
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Serving metrics on :{port}/metrics")
+    return server
@@ -0,0 +1,134 @@
+"""
+Non blocking notifications to the developer's Telegram.
+
+`notify` only puts the message on a bounded queue , a background thread sends it. Messages
+arriving within NOTIFY_DIGEST_SECONDS of each other are sent as one digest and a message that
+was sent in the last NOTIFY_COALESCE_SECONDS (ex "COOKIE EXPIRED" from every failed lookup) is
+dropped until its window is over.
+"""
+import atexit
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import (TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_API_URL, NOTIFY_QUEUE_SIZE, NOTIFY_TIMEOUT,
+                       NOTIFY_COALESCE_SECONDS, NOTIFY_DIGEST_SECONDS)
+
+
+class TelegramTransport:
+    """
+    Sends messages with the Bot API over one pooled keep-alive session.
+
+    `api_url` can point to a local HTTP stub in tests.
+    """
+
+    def __init__(self, token: str = TELEGRAM_BOT_TOKEN, chat_id: str = TELEGRAM_CHAT_ID,
+                 api_url: str = TELEGRAM_API_URL, timeout: float = NOTIFY_TIMEOUT):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount(api_url, HTTPAdapter(pool_maxsize=1, max_retries=2))
+
+    def send(self, text: str):
+        response = self.session.post(self.url, data={"chat_id": self.chat_id, "text": text}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class Notifier:
+    """
+    Bounded queue of messages drained by one daemon thread.
+
+    Args:
+        transport: Any object with send(text) , TelegramTransport by default.
+        queue_size (int): Messages waiting at most , newer ones are dropped when it is full.
+        coalesce_seconds (float): A message sent in this window is not sent again.
+        digest_seconds (float): Messages arriving within this time are sent together.
+    """
+
+    def __init__(self, transport=None, queue_size: int = NOTIFY_QUEUE_SIZE,
+                 coalesce_seconds: float = NOTIFY_COALESCE_SECONDS, digest_seconds: float = NOTIFY_DIGEST_SECONDS):
+        self.transport = transport
+        self.coalesce_seconds = coalesce_seconds
+        self.digest_seconds = digest_seconds
+        self.dropped = 0
+        self.coalesced = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._last_sent = {}
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def notify(self, text: str):
+        """
+        Queues a message , never blocks the caller.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                if self.transport is None:
+                    self.transport = TelegramTransport()
+                self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = {first: 1}
+            # Collect everything that arrives during the digest window
+            deadline = time.monotonic() + self.digest_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set() and self._queue.empty():
+                    break
+                try:
+                    text = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch[text] = batch.get(text, 0) + 1
+            self._send(batch)
+
+    def _send(self, batch: dict):
+        now = time.monotonic()
+        lines = []
+        for text, count in batch.items():
+            if now - self._last_sent.get(text, float("-inf")) < self.coalesce_seconds:
+                self.coalesced += count
+                continue
+            self._last_sent[text] = now
+            lines.append(text if count == 1 else f"{text} (x{count})")
+        if not lines:
+            return
+        message = lines[0] if len(lines) == 1 else f"{len(lines)} notifications:\n" + "\n".join(f"- {line}" for line in lines)
+        try:
+            self.transport.send(message)
+        except Exception as e:
+            print(f"[NOTIFY] Failed to send {message!r}: {e}")
+
+    def close(self, timeout: float = None):
+        """
+        Sends what is still queued and stops the thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout if timeout is not None else self.digest_seconds + NOTIFY_TIMEOUT)
+
+
+notifier = Notifier()
+
+
+def notify(text: str):
+    notifier.notify(text)
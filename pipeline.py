@@ -0,0 +1,72 @@
+import queue
+import threading
+
+_DONE = object()
+
+
+def run_pipeline(items, stages, queue_size: int = 1):
+    """
+    Runs items through a chain of stages connected by bounded queues (producer/consumer).
+
+    Every stage has its own worker threads , so while one item is in a slow stage the next
+    item is already processed by the earlier ones. A failing item is dropped from the
+    remaining stages and reported.
+
+    Args:
+        items (iterable): Inputs of the first stage.
+        stages (list[tuple]): (name , fn , workers) of every stage , fn gets the output of the previous stage.
+        queue_size (int): Number of finished items a stage may hold before it waits for the next one.
+    Returns:
+        (results , errors) , results is a list of (index , output of the last stage) in completion
+        order and errors a list of (index , stage name , exception)
+    """
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    results = []
+    errors = []
+    lock = threading.Lock()
+    remaining = [workers for _, _, workers in stages]
+
+    def worker(k):
+        name, fn, _ = stages[k]
+        while True:
+            entry = queues[k].get()
+            if entry is _DONE:
+                break
+            index, value = entry
+            try:
+                output = fn(value)
+            except Exception as e:
+                print(f"[PIPELINE] {name} failed for item {index}: {e}")
+                with lock:
+                    errors.append((index, name, e))
+                continue
+            if k + 1 < len(stages):
+                queues[k + 1].put((index, output))
+            else:
+                with lock:
+                    results.append((index, output))
+
+        # The last worker of a stage tells the next stage that no more items are coming
+        with lock:
+            remaining[k] -= 1
+            last = remaining[k] == 0
+        if last and k + 1 < len(stages):
+            for _ in range(stages[k + 1][2]):
+                queues[k + 1].put(_DONE)
+
+    threads = [
+        threading.Thread(target=worker, args=(k,), name=f"pipeline-{stages[k][0]}-{w}", daemon=True)
+        for k in range(len(stages))
+        for w in range(stages[k][2])
+    ]
+    for thread in threads:
+        thread.start()
+
+    for index, item in enumerate(items):
+        queues[0].put((index, item))
+    for _ in range(stages[0][2]):
+        queues[0].put(_DONE)
+
+    for thread in threads:
+        thread.join()
+    return results, errors
@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from constants import BURNT_PODCASTS_PATH, BURNT_PODCASTS_JSON
+
+
+class BurntPodcastStore:
+    """
+    Podcasts that were already turned into clips , indexed by video id.
+
+    Replaces burnt_podcasts.json , whose ids are imported the first time the store is opened.
+    """
+
+    def __init__(self, path: str = BURNT_PODCASTS_PATH, legacy_json: str = BURNT_PODCASTS_JSON):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS burnt_podcasts ("
+                "video_id TEXT PRIMARY KEY, title TEXT, burnt_at REAL NOT NULL, last_seen_at REAL NOT NULL)"
+            )
+            empty = self._conn.execute("SELECT 1 FROM burnt_podcasts LIMIT 1").fetchone() is None
+        if empty and legacy_json and os.path.exists(legacy_json):
+            self._import_json(legacy_json)
+
+    def _import_json(self, legacy_json: str):
+        try:
+            with open(legacy_json) as fp:
+                video_ids = json.load(fp)
+        except json.JSONDecodeError:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO burnt_podcasts (video_id, burnt_at, last_seen_at) VALUES (?, ?, ?)",
+                [(video_id, now, now) for video_id in video_ids],
+            )
+        print(f"Imported {len(video_ids)} burnt podcasts from {legacy_json}")
+
+    def mark(self, video_id: str, title: str = None):
+        """
+        Marks a podcast as burnt , marking it again only refreshes `last_seen_at`.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO burnt_podcasts (video_id, title, burnt_at, last_seen_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET last_seen_at = excluded.last_seen_at, "
+                "title = COALESCE(excluded.title, burnt_podcasts.title)",
+                (video_id, title, now, now),
+            )
+
+    def burnt(self, video_ids) -> set:
+        """
+        The ids out of `video_ids` that are burnt , one indexed lookup per search page.
+        """
+        video_ids = list(video_ids)
+        if not video_ids:
+            return set()
+        placeholders = ",".join("?" * len(video_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT video_id FROM burnt_podcasts WHERE video_id IN ({placeholders})", video_ids
+            ).fetchall()
+        return {video_id for video_id, in rows}
+
+    def __contains__(self, video_id: str) -> bool:
+        return bool(self.burnt([video_id]))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM burnt_podcasts").fetchone()[0]
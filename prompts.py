@@ -1,7 +1,6 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import AIMessage, HumanMessage , SystemMessage , ToolMessage
-moments_template = ChatPromptTemplate([
-    ('system' , """
+moments_system_prompt = """
 You are a short-form content strategist and viral media expert, specializing in creating engaging, emotional, or controversial TikTok-style clips from podcasts.
 
 Your primary goal is to identify and extract 2-3 (or more, if the content is exceptionally strong) standalone video moments from a given podcast.
@@ -24,8 +23,24 @@ Prioritize clips that:
 - Contain **strong hooks**, punchlines, or memorable quotes.
 
 Only include clips that feel powerful or viral-ready. If the content is weak or mundane, or if no clips meet the strict 60-150 second duration, return an empty list.
+"""
+
+moments_human_prompt = "Here is the list of transcript segments - \n Podcast Title : {podcast_title} \nPodcast_description : {podcast_description}\n Transcript: \n {transcript}"
+
+moments_template = ChatPromptTemplate([
+    ('system' , moments_system_prompt),
+    ('human' , moments_human_prompt)
+])
+
+# Same task over the compact transcript format of chunking.format_compact
+moments_compact_template = ChatPromptTemplate([
+    ('system' , moments_system_prompt.replace(
+        "- A **transcript in SRT format**",
+        "- A **transcript in compact format** , every line is `[offset] text` where offset is the number of seconds since the start of this transcript part"
+    ) + """
+Return `start_time` and `end_time` of every clip as offsets in seconds on the same scale as the transcript (ex `125` and `230`). Use the offset of the line where the clip starts and the offset where the clip ends.
 """),
-    ('human' ,"Here is the list of transcript segments - \n Podcast Title : {podcast_title} \nPodcast_description : {podcast_description}\n Transcript: \n {transcript}")
+    ('human' , moments_human_prompt)
 ])
 
 podcast_selector_prompt = ChatPromptTemplate([
@@ -49,10 +64,7 @@ Evaluate and choose the most promising podcast based on:
 3. Uniqueness or cultural relevance
 4. Likelihood of strong short-form clips (e.g., compelling guests, emotional stories, bold statements)
 5. Only include podcasts in Hindi or English (infer from title, description, or channel name).
-6. Dont pick the podcasts whose video_id is in the excluded list
-Only pick **one** podcast from the list. If all are in the excluded list then make the selected field false otherwise strictly select one.
-     
-Excluded_List : {excluded_list}
+Only pick **one** podcast from the list. If none of them is in Hindi or English then make the selected field false otherwise strictly select one.
 """),
     ('human' ,"""
 Here is the list of podcast metadata:
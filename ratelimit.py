@@ -0,0 +1,86 @@
+import threading
+from collections import deque
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of a text , Gemini averages about 4 characters per token.
+    """
+    return len(text) // 4 + 1
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket limiter for LLM calls with one bucket for requests per minute
+    and one for tokens per minute. Both buckets refill continuously.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0):
+        """
+        Blocks until one request and `tokens` tokens are available and takes them.
+
+        Args:
+            tokens (int) : Estimated tokens of the call , capped at the per minute budget
+        """
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute,
+                )
+            time.sleep(max(wait, 0.01))
+
+
+def batch_with_limiter(runnable, inputs, limiter: TokenBucketLimiter, max_workers: int = 4):
+    """
+    Invokes a runnable on every input concurrently while respecting the rate limiter.
+
+    Args:
+        runnable : Any langchain runnable (chain)
+        inputs (iterable[dict]) : Inputs of the runnable
+        limiter (TokenBucketLimiter) : Limiter shared by all LLM calls , None when the
+            runnable takes from the limiter itself
+        max_workers (int) : Maximum number of calls in flight
+    Returns:
+        list of results in the same order as the inputs
+    """
+    def run(item):
+        if limiter is not None:
+            limiter.acquire(estimate_tokens(" ".join(str(value) for value in item.values())))
+        return runnable.invoke(item)
+
+    # Inputs may be a generator , only a couple of items per worker are taken ahead of time
+    max_workers = max(1, max_workers)
+    results = []
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for item in inputs:
+            pending.append(pool.submit(run, item))
+            if len(pending) >= 2 * max_workers:
+                results.append(pending.popleft().result())
+        while pending:
+            results.append(pending.popleft().result())
+    return results
@@ -0,0 +1,282 @@
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pysrt
+
+from constants import RENDER_THREADS_PER_JOB, RENDER_JOB_MEMORY_MB, RENDER_MAX_WORKERS, FILTER_PROFILE, RENDER_PROFILE
+from subtitle_fix import shift_subtitles_to_zero_start , srt_to_ass
+import metrics
+
+
+def to_seconds(t) -> float:
+    """
+    Converts 'HH:MM:SS(.mmm)' , 'HH:MM:SS,mmm' , 'MM:SS' or plain seconds into seconds.
+    """
+    if isinstance(t, (int, float)):
+        return float(t)
+    parts = [float(p) for p in t.replace(",", ".").split(':')]
+    if len(parts) == 3:
+        return parts[0]*3600 + parts[1]*60 + parts[2]
+    elif len(parts) == 2:
+        return parts[0]*60 + parts[1]
+    else:
+        return parts[0]
+
+
+def prepare_captions(srt_file: str, clip_start=None) -> str:
+    """
+    Shifts the clip subtitles to start at zero and converts them to a styled .ass file.
+
+    Args:
+        srt_file (str): Path to the clip subtitle (.srt) file , rewritten in place.
+        clip_start: Start of the clip in the podcast (seconds or 'HH:MM:SS,mmm'). When given the
+            captions are shifted by exactly this amount so they line up with the clip start ,
+            otherwise the first caption is moved to zero.
+    Returns:
+        Path of the generated .ass file
+    """
+    if clip_start is not None:
+        subs = pysrt.open(srt_file, encoding='utf-8')
+        subs.shift(milliseconds=-round(to_seconds(clip_start) * 1000))
+        subs.save(srt_file, encoding='utf-8')
+    else:
+        with open(srt_file, "r", encoding='utf-8') as d:
+            data_subtitle = d.read()
+        shifted_subtitles = shift_subtitles_to_zero_start(data_subtitle)
+
+        with open(srt_file, 'w+', encoding='utf-8') as d:
+            d.write(shifted_subtitles)
+    ass_file = srt_file + "-.ass"
+    srt_to_ass(srt_file, ass_file)
+    return ass_file
+
+
+def blur_background_filter(ass_file: str, input_label: str, output_label: str, prefix: str = "") -> str:
+    """
+    Filter graph that burns the captions and puts the video over a blurred 9:16 copy of itself.
+
+    Args:
+        ass_file (str): Captions to burn.
+        input_label (str): Label of the input video stream ex `0:v`.
+        output_label (str): Label given to the output stream.
+        prefix (str): Prefix for the intermediate labels so several graphs can live in one filter_complex.
+    """
+    return (
+        f"[{input_label}]subtitles={ass_file},"
+        f"split[{prefix}original][{prefix}copy];"
+        f"[{prefix}copy]scale=-1:ih*(16/9)*(16/9),"
+        "crop=w=ih*9/16,"
+        f"gblur=sigma=20[{prefix}blurred];"
+        f"[{prefix}blurred][{prefix}original]overlay=(main_w-overlay_w)/2:(main_h-overlay_h)/2[{output_label}]"
+    )
+
+
+def fast_blur_background_filter(ass_file: str, input_label: str, output_label: str, prefix: str = "") -> str:
+    """
+    Cheaper version of `blur_background_filter` with a fixed 720x1280 output.
+
+    The background is downscaled to 1/4 of the output size , box blurred there and scaled back up ,
+    the foreground is scaled to the output width and the captions are burned once on the composite.
+    """
+    return (
+        f"[{input_label}]split[{prefix}front][{prefix}back];"
+        f"[{prefix}back]scale=180:320:force_original_aspect_ratio=increase,crop=180:320,"
+        "boxblur=luma_radius=10:luma_power=2,"
+        f"scale=720:1280[{prefix}blurred];"
+        f"[{prefix}front]scale=720:-2[{prefix}scaled];"
+        f"[{prefix}blurred][{prefix}scaled]overlay=(main_w-overlay_w)/2:(main_h-overlay_h)/2,"
+        f"setsar=1,subtitles={ass_file}[{output_label}]"
+    )
+
+
+FILTER_PROFILES = {
+    "legacy": blur_background_filter,
+    "fast": fast_blur_background_filter,
+}
+
+
+def background_filter(ass_file: str, input_label: str, output_label: str, prefix: str = "", profile: str = None) -> str:
+    """
+    Builds the 9:16 blurred background graph of the given profile , FILTER_PROFILE by default.
+    """
+    profile = profile or FILTER_PROFILE
+    if profile not in FILTER_PROFILES:
+        raise ValueError(f"Unknown filter profile {profile} , expected one of {list(FILTER_PROFILES)}")
+    return FILTER_PROFILES[profile](ass_file, input_label, output_label, prefix)
+
+
+# x264/aac settings per render profile , gop is in frames (2 seconds at 30 fps suits Shorts)
+ENCODER_PROFILES = {
+    "fast": {"preset": "veryfast", "crf": 26, "tune": None, "gop": 60, "audio_bitrate": "128k"},
+    "balanced": {"preset": "medium", "crf": 23, "tune": "film", "gop": 60, "audio_bitrate": "128k"},
+    "quality": {"preset": "slow", "crf": 19, "tune": "film", "gop": 60, "audio_bitrate": "192k"},
+}
+
+
+def encoder_args(profile: str = None) -> list:
+    """
+    FFmpeg output options of a render profile , RENDER_PROFILE by default.
+    """
+    profile = profile or RENDER_PROFILE
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown render profile {profile} , expected one of {list(ENCODER_PROFILES)}")
+    settings = ENCODER_PROFILES[profile]
+
+    args = ["-c:v", "libx264", "-preset", settings["preset"], "-crf", str(settings["crf"])]
+    if settings["tune"]:
+        args += ["-tune", settings["tune"]]
+    args += [
+        "-g", str(settings["gop"]),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", settings["audio_bitrate"],
+        "-movflags", "+faststart",
+    ]
+    return args
+
+
+def render_clips_single_pass(input_video: str, clips: list, encoder_profile: str = None) -> bool:
+    """
+    Renders every clip of a podcast with one FFmpeg process so the source is decoded once.
+
+    The input is seeked to the first clip and each clip is cut out of the shared decode with
+    trim/atrim branches of a single filter_complex , one output file per clip.
+
+    Args:
+        input_video (str): Path of the full podcast video.
+        clips (list[dict]): Clips with `start_time` , `end_time` (seconds or 'HH:MM:SS,mmm') ,
+            `srt_file` and `output_video`.
+        encoder_profile (str): Render profile of ENCODER_PROFILES , RENDER_PROFILE when None.
+    Returns:
+        True if FFmpeg succeeded
+    """
+    if not clips:
+        return True
+
+    spans = [(to_seconds(clip["start_time"]), to_seconds(clip["end_time"])) for clip in clips]
+    seek = min(start for start, _ in spans)
+    duration = max(end for _, end in spans) - seek
+
+    n = len(clips)
+    graph = [
+        "[0:v]split=" + str(n) + "".join(f"[v{i}]" for i in range(n)),
+        "[0:a]asplit=" + str(n) + "".join(f"[a{i}]" for i in range(n)),
+    ]
+    outputs = []
+    for i, (clip, (start, end)) in enumerate(zip(clips, spans)):
+        ass_file = prepare_captions(clip["srt_file"], clip_start=start)
+        graph.append(f"[v{i}]trim=start={start - seek:.3f}:end={end - seek:.3f},setpts=PTS-STARTPTS[t{i}]")
+        graph.append(background_filter(ass_file, f"t{i}", f"vout{i}", prefix=f"c{i}"))
+        graph.append(f"[a{i}]atrim=start={start - seek:.3f}:end={end - seek:.3f},asetpts=PTS-STARTPTS[aout{i}]")
+        outputs += ["-map", f"[vout{i}]", "-map", f"[aout{i}]", *encoder_args(encoder_profile), clip["output_video"]]
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-ss", f"{seek:.3f}",
+        "-t", f"{duration:.3f}",
+        "-i", input_video,
+        "-filter_complex", ";".join(graph),
+    ] + outputs
+
+    print("Running FFmpeg command:")
+    print(" ".join(command))
+
+    with render_slots, metrics.track("ffmpeg_render"):
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True)
+    metrics.observe_ffmpeg(process.stderr)
+
+    if process.returncode == 0:
+        metrics.add_file_size("bytes_written", *(clip["output_video"] for clip in clips))
+        print(f"Successfully rendered {n} clips from {input_video}")
+        return True
+    print("Error running FFmpeg:")
+    print(process.stderr)
+    return False
+
+
+def available_memory_mb():
+    """
+    Memory available for new processes in MB , None when it cannot be read.
+    """
+    try:
+        with open("/proc/meminfo") as fp:
+            for line in fp:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def plan_render_slots(jobs: int, threads_per_job: int = RENDER_THREADS_PER_JOB, job_memory_mb: int = RENDER_JOB_MEMORY_MB, max_workers: int = RENDER_MAX_WORKERS):
+    """
+    Decides how many encodes run at once and how many threads each one gets.
+
+    The number of concurrent encodes is the cpu count divided by the threads per job ,
+    capped by the memory available for `job_memory_mb` sized ffmpeg processes.
+
+    Returns:
+        (workers , threads_per_job) tuple
+    """
+    cpus = os.cpu_count() or 1
+    threads_per_job = max(1, min(threads_per_job, cpus))
+    workers = max(1, cpus // threads_per_job)
+
+    memory = available_memory_mb()
+    if memory is not None and job_memory_mb > 0:
+        workers = min(workers, max(1, memory // job_memory_mb))
+    if max_workers > 0:
+        workers = min(workers, max_workers)
+    workers = max(1, min(workers, jobs))
+
+    # Hand the cores left idle by a short queue to the running encodes
+    threads_per_job = max(threads_per_job, cpus // workers)
+    return workers, threads_per_job
+
+
+# Encodes running at once across every podcast of this process , sized for a full queue
+render_slots = threading.BoundedSemaphore(plan_render_slots(os.cpu_count() or 1)[0])
+
+
+def in_render_slot(render_fn, **job):
+    """
+    Runs one render once a shared render slot is free.
+    """
+    with render_slots:
+        return render_fn(**job)
+
+
+def render_clips_parallel(jobs: list, render_fn):
+    """
+    Runs clip encodes concurrently , each one in its own ffmpeg process.
+
+    Args:
+        jobs (list[dict]): Keyword arguments of `render_fn` for every clip , must contain `output_video`.
+        render_fn (callable): Renders one clip , gets the job kwargs plus `threads` and returns True on success.
+    Returns:
+        list of {"clip" , "output_video" , "error"} dicts for the clips that failed
+    """
+    if not jobs:
+        return []
+    workers, threads = plan_render_slots(len(jobs))
+    print(f"Rendering {len(jobs)} clips with {workers} parallel jobs of {threads} threads")
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(in_render_slot, render_fn, threads=threads, **job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                ok = future.result()
+                error = None if ok else "ffmpeg failed"
+            except Exception as e:
+                error = str(e)
+            if error is not None:
+                errors.append({"clip": i, "output_video": jobs[i]["output_video"], "error": error})
+
+    return sorted(errors, key=lambda e: e["clip"])
@@ -30,4 +30,11 @@ class Best_Podcast(BaseModel):
     selected:bool = Field(description="If best podcast selected True if not False")
 
 class MomentsList(BaseModel):
-    Moments: List[Moment]
\ No newline at end of file
+    Moments: List[Moment]
+
+class CompactMoment(Moment):
+    start_time:float = Field(description="Start of the clip as the offset in seconds shown in the transcript ex `125`")
+    end_time:float = Field(description="End of the clip as the offset in seconds shown in the transcript ex `230`")
+
+class CompactMomentsList(BaseModel):
+    Moments: List[CompactMoment]
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Long running PodPilot service , an alternative to starting `python agent.py` from cron.
+
+The compiled graph , the Gemini client , the YouTube client and the HTTP sessions are created
+once and stay warm between cycles. Cycles run every SERVICE_INTERVAL_SECONDS , moved by up to
+SERVICE_JITTER_SECONDS either way.
+
+Signals:
+    SIGTERM / SIGINT : finish the running cycle and exit
+    SIGHUP           : finish the running cycle and restart the process with fresh code and .env
+
+ffmpeg and yt-dlp are started in their own sessions , a Ctrl+C in the terminal only reaches the service.
+
+Run with:
+    python service.py
+"""
+import os
+import random
+import signal
+import sys
+import threading
+import traceback
+
+from constants import SERVICE_INTERVAL_SECONDS, SERVICE_JITTER_SECONDS, UPLOAD_MODE
+
+stop_event = threading.Event()
+reload_requested = threading.Event()
+
+
+def next_delay(interval: float = SERVICE_INTERVAL_SECONDS, jitter: float = SERVICE_JITTER_SECONDS) -> float:
+    """
+    Seconds until the next cycle , jittered so restarts do not line up on the same minute.
+    """
+    return max(0.0, interval + random.uniform(-jitter, jitter))
+
+
+def handle_stop(signum, frame):
+    print(f"Received {signal.Signals(signum).name} , stopping after the current cycle")
+    stop_event.set()
+
+
+def handle_reload(signum, frame):
+    print("Received SIGHUP , reloading after the current cycle")
+    reload_requested.set()
+    stop_event.set()
+
+
+def warm_up():
+    """
+    Imports the agent (graph , LLM client , caches) and builds the YouTube client once.
+    """
+    import agent
+
+    try:
+        from yt_upload import get_authenticated_service
+        get_authenticated_service()
+    except Exception as e:
+        # Uploads report their own errors , the service can still search and render
+        print(f"[SERVICE] YouTube client not ready: {e}")
+    return agent
+
+
+def main():
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGHUP, handle_reload)
+
+    agent = warm_up()
+    import metrics
+    from notify import notifier
+    metrics.serve()
+
+    worker = None
+    if UPLOAD_MODE == "queue":
+        # The queue is drained inside the service , no separate `python upload_queue.py` needed
+        from upload_queue import start_background_worker
+        from tools import upload_video
+        worker = start_background_worker(agent.upload_queue, upload_video, stop_event)
+
+    print(f"PodPilot service started (pid {os.getpid()})")
+    while not stop_event.is_set():
+        try:
+            agent.run_cycles()
+        except Exception as e:
+            traceback.print_exc()
+            agent.send_video.invoke(f"CYCLE FAILED :: {e}")
+        delay = next_delay()
+        if not stop_event.is_set():
+            print(f"NEXT CYCLE IN {delay / 60:.1f} MINUTES")
+        stop_event.wait(delay)
+
+    if worker is not None:
+        worker.join(timeout=60)
+    notifier.close()
+
+    if reload_requested.is_set():
+        print("Restarting ...")
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+if __name__ == "__main__":
+    main()
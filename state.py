@@ -9,4 +9,7 @@ class AgentState(TypedDict):
     agent_outcome: Union[AgentAction, AgentFinish, None]
     intermediate_steps: Annotated[list[tuple[AgentAction, str]], operator.add]
     podcast_list:Any
+    render_errors:Optional[List[dict]]
+    clip_sources:Optional[List[dict]]
+    render_profile:Optional[Literal["fast" , "balanced" , "quality"]]
     retry:Literal[None , "week" , "month"]
\ No newline at end of file
@@ -2,8 +2,7 @@ from langchain_community.tools import YouTubeSearchTool
 from langchain_core.tools import tool
 import subprocess
 
-import requests
-from subtitle_fix import shift_subtitles_to_zero_start , srt_to_ass
+from render import to_seconds , prepare_captions , background_filter , encoder_args
 
 yt_tool = YouTubeSearchTool()
 import glob
@@ -16,6 +15,17 @@ class TrimMediaInput(BaseModel):
     end_time: str = Field(...)
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from constants import METADATA_FETCH_WORKERS, METADATA_FETCH_TIMEOUT, METADATA_CACHE_PATH, METADATA_CACHE_TTL, METADATA_CACHE_MAX_ENTRIES, DOWNLOAD_WORKERS
+from cache import MetadataCache
+import metrics
+from notify import notify
+
+metadata_cache = MetadataCache(METADATA_CACHE_PATH, ttl=METADATA_CACHE_TTL, max_entries=METADATA_CACHE_MAX_ENTRIES)
+
+# yt-dlp downloads running at once , shared by every podcast processed in this process
+download_slots = threading.BoundedSemaphore(max(1, DOWNLOAD_WORKERS))
 
 @tool
 def report_error(error: str) -> None:
@@ -40,6 +50,25 @@ def get_youtube_object(video_id: str) -> dict:
     Returns:
         return the description of the video 
     """
+    return fetch_youtube_metadata(video_id)
+
+
+def fetch_youtube_metadata(video_id: str, timeout: float = None):
+    """
+    Fetches the description and the original auto caption language of a video using yt-dlp.
+    Results are served from the metadata cache when the video was looked up recently.
+
+    Args:
+        video_id (str) : The youtube Id of the object
+        timeout (float) : Seconds after which the yt-dlp process is killed , None waits forever
+    Returns:
+        (description , lang_code) tuple or None if the lookup failed
+    """
+    cached = metadata_cache.get_video(video_id)
+    if cached is not None:
+        lang_code = next((code for code in cached["caption_langs"] if code.endswith("-orig")), None)
+        return cached["description"] , lang_code
+
     video_url = f"https://www.youtube.com/watch?v={video_id}"
     cookies_path = "./cookie.txt"
 
@@ -54,14 +83,19 @@ def get_youtube_object(video_id: str) -> dict:
     ]
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        with metrics.track("ytdlp_metadata"):
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=timeout, start_new_session=True)
+        metrics.add("bytes_downloaded", len(result.stdout))
         info = json.loads(result.stdout)
+        metadata_cache.set_video(video_id, info)
         subtitles = info.get("automatic_captions", {})
         lang_code = next((code for code in subtitles if code.endswith("-orig")), None)
         return info.get('description') , lang_code
     except subprocess.CalledProcessError as e:
         send_video.invoke("COOKIE EXPIRED")
         print(f"[ERROR] yt-dlp failed: {e.stderr}")
+    except subprocess.TimeoutExpired:
+        print(f"[ERROR] yt-dlp timed out after {timeout}s for {video_id}")
     except json.JSONDecodeError as e:
         print(f"[ERROR] Failed to parse JSON output: {e}")
 
@@ -69,6 +103,37 @@ def get_youtube_object(video_id: str) -> dict:
     return None
 
 
+def fetch_youtube_objects(video_ids, max_workers: int = METADATA_FETCH_WORKERS, timeout: float = METADATA_FETCH_TIMEOUT):
+    """
+    Fetches the metadata of many videos at once with a bounded pool of yt-dlp processes.
+
+    Args:
+        video_ids (list[str]) : Youtube ids of the videos
+        max_workers (int) : Maximum number of yt-dlp processes running at the same time
+        timeout (float) : Seconds after which a single lookup is given up
+    Returns:
+        list of (description , lang_code) tuples in the same order as video_ids ,
+        None in place of every video whose lookup failed
+    """
+    results = [None] * len(video_ids)
+    if not video_ids:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(video_ids)))) as pool:
+        futures = {
+            pool.submit(fetch_youtube_metadata, video_id, timeout): i
+            for i, video_id in enumerate(video_ids)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                print(f"[ERROR] Metadata lookup failed for {video_ids[i]}: {e}")
+
+    return results
+
+
 from pydantic import BaseModel, Field
 
 
@@ -85,17 +150,6 @@ def trim_media(input: TrimMediaInput):
     The function uses FFmpeg to extract a specific portion of the file without re-encoding.
     """
 
-    def to_seconds(t):
-        if isinstance(t, (int, float)):
-            return float(t)
-        parts = [float(p) for p in t.split(':')]
-        if len(parts) == 3:
-            return parts[0]*3600 + parts[1]*60 + parts[2]
-        elif len(parts) == 2:
-            return parts[0]*60 + parts[1]
-        else:
-            return parts[0]
-
     start_sec = to_seconds(input["start_time"])
     end_sec = to_seconds(input["end_time"])
     duration = end_sec - start_sec
@@ -111,23 +165,30 @@ def trim_media(input: TrimMediaInput):
     ]
 
     try:
-        subprocess.run(command, check=True)
+        with metrics.track("ffmpeg_trim"):
+            subprocess.run(command, check=True, start_new_session=True)
+        metrics.add_file_size("bytes_written", input["output_file"])
         print(f"Trimmed media saved to {input['output_file']}")
+        return True
     except subprocess.CalledProcessError as e:
         print("Error trimming media:", e)
+        return False
 
 
 
 
 
-def youtube_tool(video_id:str, lang:str, output_path: str = "./data/current_podcast.mp4"):
+def youtube_tool(video_id:str, lang:str, output_path: str = "./data/current_podcast.mp4", skip_video: bool = False):
     """
     Downloads a YouTube video using yt-dlp subprocess and a cookie file.
 
     Args:
         info (Any): The video info object or video ID/URL.
-        lang (str) : Subtitle code
-        output_path (str): Path to save the downloaded file.
+        lang (str) : Subtitle code , None downloads the video without subtitles
+        output_path (str): Path to save the downloaded file , the subtitles are saved next to it.
+        skip_video (bool) : Only fetch the subtitles , the clips are downloaded later with `download_sections`
+    Returns:
+        path of the downloaded .srt file or None when the video has no auto captions in `lang`
     """
     # Determine video URL
     video_url = "https://youtube.com/watch?v="+video_id
@@ -135,28 +196,120 @@ def youtube_tool(video_id:str, lang:str, output_path: str = "./data/current_podc
     if not video_url:
         raise ValueError("Invalid video info or missing URL.")
 
+    output_stem = os.path.splitext(output_path)[0]
+    if lang is None and skip_video:
+        return None
+    subtitles = ["--write-auto-sub", "--sub-format" , "srt", "--sub-langs" , lang] if lang else []
     cmd = [
         "yt-dlp",
         "--cookies", "./cookie.txt",
-        "-f", "best",
-        "--write-auto-sub",
-        "--sub-format" , "srt",
-        "--sub-langs" , lang,
-        '-o' ,"./data/current_podcast.%(ext)s",
+        *(["--skip-download"] if skip_video else ["-f", "best"]),
+        *subtitles,
+        '-o' ,output_stem + ".%(ext)s",
         video_url
     ]
 
     try:
-        subprocess.run(cmd, check=True)
-        print(f"[SUCCESS] Video downloaded to: {output_path}")
+        with download_slots, metrics.track("ytdlp_download"):
+            subprocess.run(cmd, check=True, start_new_session=True)
+        metrics.add_file_size("bytes_downloaded", *glob.glob(glob.escape(output_stem) + '*'))
+        print(f"[SUCCESS] {'Subtitles' if skip_video else 'Video'} downloaded to: {output_path}")
     except subprocess.CalledProcessError as e:
         send_video.invoke("COOKIE EXPIRED")
         print(f"[ERROR] Download failed:\n{e}")
-    filepath = glob.glob('./data/current_podcast*.srt')[0]
-    return filepath
+    if not lang:
+        return None
+    # No match when YouTube has no captions in that language , the transcript providers fall back to ASR
+    matches = glob.glob(glob.escape(output_stem) + '*.srt')
+    return matches[0] if matches else None
+
+
+def download_section(video_id: str, start: float, end: float, output_path: str) -> bool:
+    """
+    Downloads only the part of a YouTube video between start and end seconds.
 
+    The cuts are re-keyframed (`--force-keyframes-at-cuts`) so the file starts exactly at `start`.
 
-def convert_and_add_captions(input_video: str, srt_file: str, output_video: str):
+    Args:
+        video_id (str) : Youtube id of the podcast
+        start (float) : Section start in seconds
+        end (float) : Section end in seconds
+        output_path (str) : Path of the downloaded section
+    Returns:
+        True if the section was downloaded
+    """
+    video_url = "https://youtube.com/watch?v="+video_id
+    cmd = [
+        "yt-dlp",
+        "--cookies", "./cookie.txt",
+        "-f", "best",
+        "--download-sections", f"*{start:.3f}-{end:.3f}",
+        "--force-keyframes-at-cuts",
+        "-o", output_path,
+        video_url
+    ]
+
+    try:
+        with download_slots, metrics.track("ytdlp_section"):
+            subprocess.run(cmd, check=True, start_new_session=True)
+        metrics.add_file_size("bytes_downloaded", output_path)
+        print(f"[SUCCESS] Section {start:.1f}-{end:.1f}s downloaded to: {output_path}")
+        return True
+    except subprocess.CalledProcessError as e:
+        send_video.invoke("COOKIE EXPIRED")
+        print(f"[ERROR] Section download failed:\n{e}")
+        return False
+
+
+def download_audio(video_id: str, output_stem: str):
+    """
+    Downloads only the audio track of a YouTube video , for transcribing it locally.
+
+    Args:
+        video_id (str) : Youtube id of the podcast
+        output_stem (str) : Path of the download without the extension
+    Returns:
+        path of the downloaded audio or None if the download failed
+    """
+    video_url = "https://youtube.com/watch?v="+video_id
+    cmd = [
+        "yt-dlp",
+        "--cookies", "./cookie.txt",
+        "-f", "bestaudio",
+        "-o", output_stem + ".%(ext)s",
+        video_url
+    ]
+
+    try:
+        with download_slots, metrics.track("ytdlp_audio"):
+            subprocess.run(cmd, check=True, start_new_session=True)
+    except subprocess.CalledProcessError as e:
+        send_video.invoke("COOKIE EXPIRED")
+        print(f"[ERROR] Audio download failed:\n{e}")
+        return None
+    matches = glob.glob(glob.escape(output_stem) + '.*')
+    metrics.add_file_size("bytes_downloaded", *matches)
+    return matches[0] if matches else None
+
+
+def download_sections(video_id: str, sections: list, max_workers: int = DOWNLOAD_WORKERS) -> list:
+    """
+    Downloads several sections of a video in parallel.
+
+    Args:
+        video_id (str) : Youtube id of the podcast
+        sections (list[tuple]) : (start , end , output_path) of every section
+        max_workers (int) : Maximum number of yt-dlp downloads running at once
+    Returns:
+        list of bools in the same order as sections , True for the downloaded ones
+    """
+    if not sections:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as pool:
+        return list(pool.map(lambda section: download_section(video_id, *section), sections))
+
+
+def convert_and_add_captions(input_video: str, srt_file: str, output_video: str, threads: int = None, start_time: str = None, end_time: str = None, encoder_profile: str = None):
     """
     Convert a video to 9:16 aspect ratio, scale to HD, and burn subtitles.
 
@@ -164,48 +317,58 @@ def convert_and_add_captions(input_video: str, srt_file: str, output_video: str)
         input_video (str): Path to the input video file.
         srt_file (str): Path to the subtitle (.srt) file to burn in.
         output_video (str): Output filename for the final video.
+        threads (int): Encoder threads for this job , FFmpeg picks when None.
+        start_time (str): Optional clip start ('HH:MM:SS,mmm' or seconds). With end_time the clip is
+            cut out of the input by seeking inside this encode , which is frame accurate and
+            needs no intermediate trimmed file.
+        end_time (str): Optional clip end.
+        encoder_profile (str): Render profile (`fast` , `balanced` , `quality`) , RENDER_PROFILE when None.
 
     This function:
     - Crops to 9:16 portrait ratio.
-    - Scales to 720x1280.
+    - Scales to 720x1280 (only the `fast` FILTER_PROFILE fixes the output size).
     - Hardcodes (burns) subtitles into the video using FFmpeg.
     """
 
 
-    d = open(srt_file , "r" , encoding='utf-8')
-    data_subtitle = d.read()
-    shifted_subtitles = shift_subtitles_to_zero_start(data_subtitle)
-
-    open(srt_file , 'w+' , encoding='utf-8').write(shifted_subtitles)
-    srt_to_ass(srt_file , srt_file+"-.ass")
-
-    filter_chain = (
-    f"subtitles={srt_file+'-.ass'},"
-    "split[original][copy];"
-    "[copy]scale=-1:ih*(16/9)*(16/9),"
-    "crop=w=ih*9/16,"
-    "gblur=sigma=20[blurred];"
-    "[blurred][original]overlay=(main_w-overlay_w)/2:(main_h-overlay_h)/2"
-)
+    seek = []
+    if start_time is not None and end_time is not None:
+        start_sec = to_seconds(start_time)
+        seek = ["-ss", f"{start_sec:.3f}", "-t", f"{to_seconds(end_time) - start_sec:.3f}"]
+        ass_file = prepare_captions(srt_file, clip_start=start_sec)
+    else:
+        ass_file = prepare_captions(srt_file)
+    filter_chain = background_filter(ass_file, "0:v", "vout")
     
     command = [
     "ffmpeg",
+    *seek,
     "-i", input_video,
-    "-vf", filter_chain,
+    "-filter_complex", filter_chain,
+    "-map", "[vout]",
+    "-map", "0:a?",
+    *encoder_args(encoder_profile),
     "-y",  # Overwrite output if it exists
-    output_video
 ]
+    if threads:
+        command += ["-threads", str(threads)]
+    command.append(output_video)
 
     print("Running FFmpeg command:")
     print(" ".join(command))
 
-    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    with metrics.track("ffmpeg_render"):
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True)
+    metrics.observe_ffmpeg(process.stderr)
 
     if process.returncode == 0:
+        metrics.add_file_size("bytes_written", output_video)
         print(f"Successfully created {output_video}")
+        return True
     else:
         print("Error running FFmpeg:")
         print(process.stderr)
+        return False
 
 def print_green(text):
     print(f"\033[92m{text}\033[0m")  # Bright Green
@@ -216,7 +379,7 @@ def print_yellow(text):
 
 def upload_video(file_path , metadata ):
     """
-    Uploads the video yo YouTube
+    Uploads the video yo YouTube in this process with the shared client of yt_upload
 
     Args:
         file_path: The path of the file to upload
@@ -228,29 +391,31 @@ def upload_video(file_path , metadata ):
             keywords=["surfing" , "second"],
             category = "22"
         }
-    
+    Returns:
+        True if the video was uploaded
     """
-    command = [
-    "python",
-    "yt_upload.py",
-    "--file" , file_path  ,
-    "--title",  metadata['title'],
-    "--privacyStatus" , "public",
-    "--keywords" , ",".join(metadata["keywords"]),
-    "--category", "27",
-    "--description" , metadata["description"]
-    ]
-
-    print(" ".join(command))
-
-    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    # googleapiclient is only imported once something is uploaded
+    from yt_upload import upload
 
-    if process.returncode == 0:
-        print_green(f"Successfully uploaded {file_path}")
-    else:
-        print("Error running FFmpeg:")
-        print(process.stderr)
+    try:
+        with metrics.track("upload"):
+            video_id = upload(
+                file_path,
+                title=metadata['title'],
+                description=metadata["description"],
+                keywords=metadata["keywords"],
+                category="27",
+                privacy_status="public",
+            )
+        metrics.add_file_size("bytes_uploaded", file_path)
+        print_green(f"Successfully uploaded {file_path} as {video_id}")
+        return True
+    except Exception as e:
+        # UploadError for rejected uploads , anything else (e.g. a failed token refresh) is reported the same way
+        print("Error uploading video:")
+        print(e)
         send_video.invoke("YT UPLOAD EXPIRED")
+        return False
 
 
 
@@ -261,17 +426,8 @@ def send_video(text:str):
     Args:
         text - The message to send to developer
     """
-    token = 'yout-bot-token-here'
-    chatId = 'your-chat-id-here'
-
-    send_msg_url = f"https://api.telegram.org/bot{token}/sendMessage"
-
-    data = {
-        "chat_id": chatId,
-        "text" : text
-    }
-
-    requests.post(send_msg_url, data=data)
+    # Queued for the background notifier , a slow Telegram API never holds up the pipeline
+    notify(text)
 
 if __name__ == '__main__':
    
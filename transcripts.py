@@ -0,0 +1,265 @@
+"""
+Where the transcript of a podcast comes from.
+
+Providers are tried in the order of TRANSCRIPT_PROVIDERS until one returns a transcript:
+
+    youtube : the auto captions in the `-orig` language , downloaded with the video
+    whisper : local speech recognition with faster-whisper (int8 on the CPU) , used when the
+              video has no auto captions. Install it with `pip install faster-whisper`.
+
+Every transcript is kept in the transcript store by video id , so a podcast is never
+transcribed twice (a resumed or repeated cycle reads it from there).
+"""
+import glob
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+import zlib
+
+from chunking import format_srt_time
+from constants import (TRANSCRIPT_PROVIDERS, TRANSCRIPT_STORE_PATH, WHISPER_MODEL, WHISPER_COMPUTE_TYPE,
+                       ASR_WORKERS, ASR_CHUNK_SECONDS)
+from ratelimit import batch_with_limiter
+from tools import youtube_tool , download_audio
+import metrics
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptStore:
+    """
+    SRT text of every transcribed podcast , compressed and keyed by video id.
+    """
+
+    def __init__(self, path: str = TRANSCRIPT_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "video_id TEXT PRIMARY KEY, source TEXT NOT NULL, lang TEXT, srt BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def get(self, video_id: str):
+        """
+        (srt_text , source) or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT srt, source FROM transcripts WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8"), row[1]
+
+    def has(self, video_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM transcripts WHERE video_id = ?)", (video_id,)
+            ).fetchone()[0] == 1
+
+    def set(self, video_id: str, srt_text: str, source: str, lang: str = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (video_id, source, lang, srt, created_at) VALUES (?, ?, ?, ?, ?)",
+                (video_id, source, lang, zlib.compress(srt_text.encode("utf-8")), time.time()),
+            )
+
+
+class TranscriptProvider:
+    """
+    Interface of a transcript source.
+    """
+
+    name = None
+
+    def fetch(self, video_id: str, lang: str, video_path: str):
+        """
+        Args:
+            video_id (str): Youtube id of the podcast.
+            lang (str): Auto caption language picked from the metadata , None when there is none.
+            video_path (str): Where the podcast video is (or would be) downloaded , the
+                provider may keep its files next to it.
+        Returns:
+            the transcript as SRT text or None when this provider has nothing
+        """
+        raise NotImplementedError
+
+
+class YouTubeCaptionsProvider(TranscriptProvider):
+    """
+    The auto captions YouTube generated , they come with the video download.
+    """
+
+    name = "youtube"
+
+    def fetch(self, video_id, lang, video_path):
+        if not lang:
+            return None
+        stem = os.path.splitext(video_path)[0]
+        matches = glob.glob(glob.escape(stem) + '*.srt')
+        srt_path = matches[0] if matches else youtube_tool(video_id, lang, output_path=video_path, skip_video=True)
+        if srt_path is None:
+            return None
+        with open(srt_path, encoding="utf-8") as fp:
+            return fp.read()
+
+
+class _ChunkTranscriber:
+    """
+    Transcribes one PCM chunk , used as the runnable of `batch_with_limiter`.
+
+    Without a language the first chunk detects it and every later chunk is transcribed in it ,
+    so a podcast mixing Hindi and English does not flip language from one chunk to the next.
+    """
+
+    def __init__(self, model, language):
+        self.model = model
+        self.language = language
+
+    def invoke(self, chunk):
+        import numpy as np
+
+        offset, pcm = chunk
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, info = self.model.transcribe(audio, language=self.language, vad_filter=True)
+        if self.language is None:
+            self.language = info.language
+        return [(offset + segment.start, offset + segment.end, segment.text.strip()) for segment in segments]
+
+
+class WhisperProvider(TranscriptProvider):
+    """
+    Local speech recognition with faster-whisper on the CPU.
+
+    ffmpeg decodes the audio to 16 kHz mono PCM on a pipe , the stream is cut into
+    ASR_CHUNK_SECONDS chunks and the chunks are transcribed in parallel by ASR_WORKERS
+    workers sharing one int8 model. Only a couple of chunks per worker are held in memory.
+    """
+
+    name = "whisper"
+    _model = None
+    _model_lock = threading.Lock()
+
+    def __init__(self, model_size: str = WHISPER_MODEL, compute_type: str = WHISPER_COMPUTE_TYPE,
+                 workers: int = ASR_WORKERS, chunk_seconds: int = ASR_CHUNK_SECONDS):
+        cpus = os.cpu_count() or 1
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.workers = workers if workers > 0 else max(1, cpus // 4)
+        self.cpu_threads = max(1, cpus // self.workers)
+        self.chunk_seconds = chunk_seconds
+
+    def model(self):
+        # Loaded once per process , the service keeps it warm between cycles
+        with WhisperProvider._model_lock:
+            if WhisperProvider._model is None:
+                from faster_whisper import WhisperModel
+
+                WhisperProvider._model = WhisperModel(self.model_size, device="cpu", compute_type=self.compute_type,
+                                                      cpu_threads=self.cpu_threads, num_workers=self.workers)
+            return WhisperProvider._model
+
+    def pcm_chunks(self, source: str):
+        """
+        Yields (offset_seconds , pcm_bytes) chunks of the audio of `source` as ffmpeg decodes it.
+        """
+        command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", source,
+                   "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, start_new_session=True)
+        chunk_bytes = self.chunk_seconds * SAMPLE_RATE * 2
+        offset = 0.0
+        try:
+            while True:
+                pcm = process.stdout.read(chunk_bytes)
+                if not pcm:
+                    break
+                yield offset, pcm
+                offset += len(pcm) / (SAMPLE_RATE * 2)
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def fetch(self, video_id, lang, video_path):
+        try:
+            model = self.model()
+        except ImportError:
+            print("[TRANSCRIPT] faster-whisper is not installed , skipping local ASR")
+            return None
+
+        source = video_path if os.path.exists(video_path) else download_audio(
+            video_id, os.path.splitext(video_path)[0] + ".audio")
+        if source is None:
+            return None
+
+        # "en-orig" -> "en" , None lets whisper detect the language
+        transcriber = _ChunkTranscriber(model, lang.split("-")[0] if lang else None)
+        chunks = self.pcm_chunks(source)
+        results = []
+        print(f"TRANSCRIBING {video_id} LOCALLY WITH {self.workers} WORKERS")
+        with metrics.track("asr"):
+            if transcriber.language is None:
+                # The first chunk runs alone so the language is detected once , before the workers share it
+                first = next(chunks, None)
+                if first is None:
+                    return None
+                results.append(transcriber.invoke(first))
+                print(f"DETECTED LANGUAGE {transcriber.language}")
+            results += batch_with_limiter(transcriber, chunks, None, max_workers=self.workers)
+
+        entries = []
+        for segments in results:
+            for start, end, text in segments:
+                if text:
+                    entries.append(f"{len(entries) + 1}\n{format_srt_time(start * 1000)} --> "
+                                   f"{format_srt_time(end * 1000)}\n{text}\n")
+        return "\n".join(entries) if entries else None
+
+
+PROVIDERS = {
+    YouTubeCaptionsProvider.name: YouTubeCaptionsProvider,
+    WhisperProvider.name: WhisperProvider,
+}
+
+transcript_store = TranscriptStore()
+
+
+def get_providers(names: str = TRANSCRIPT_PROVIDERS):
+    return [PROVIDERS[name.strip()]() for name in names.split(",") if name.strip()]
+
+
+def fetch_transcript(video_id: str, lang: str, video_path: str, providers=None):
+    """
+    Writes the transcript of a podcast next to `video_path` , from the store or the first provider that has one.
+
+    Returns:
+        (path of the .srt file , name of the provider that produced it)
+    Raises:
+        RuntimeError: when no provider could produce a transcript
+    """
+    srt_path = os.path.join(os.path.dirname(video_path), "transcript.srt")
+    stored = transcript_store.get(video_id)
+    if stored is not None:
+        srt_text, source = stored
+        print(f"TRANSCRIPT OF {video_id} FROM THE STORE ({source})")
+    else:
+        providers = providers if providers is not None else get_providers()
+        for provider in providers:
+            srt_text = provider.fetch(video_id, lang, video_path)
+            if srt_text:
+                source = provider.name
+                transcript_store.set(video_id, srt_text, source, lang)
+                print(f"TRANSCRIPT OF {video_id} FROM {source}")
+                break
+        else:
+            raise RuntimeError(f"No transcript for {video_id} from {', '.join(p.name for p in providers)}")
+
+    with open(srt_path, "w", encoding="utf-8") as fp:
+        fp.write(srt_text)
+    return srt_path, source
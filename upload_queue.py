@@ -0,0 +1,241 @@
+"""
+Persistent YouTube upload queue.
+
+The graph enqueues the rendered clips with their publish times and finishes the cycle ,
+a worker drains the queue in the background while keeping to the pacing of every channel.
+
+Run the worker with:
+    python upload_queue.py
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from constants import (UPLOAD_QUEUE_PATH, UPLOAD_SPOOL_DIR, UPLOAD_INTERVAL_SECONDS, UPLOAD_DAILY_LIMIT,
+                       UPLOAD_MAX_ATTEMPTS, UPLOAD_RETRY_SECONDS, YOUTUBE_CHANNEL)
+
+
+class UploadQueue:
+    """
+    SQLite backed queue of uploads with a publish time per job and a rate limit per channel.
+    """
+
+    def __init__(self, path: str = UPLOAD_QUEUE_PATH, min_interval: float = UPLOAD_INTERVAL_SECONDS,
+                 daily_limit: int = UPLOAD_DAILY_LIMIT):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.min_interval = min_interval
+        self.daily_limit = daily_limit
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, file_path TEXT NOT NULL, "
+                "metadata TEXT NOT NULL, publish_at REAL NOT NULL, status TEXT NOT NULL DEFAULT 'pending', "
+                "attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS uploads_due ON uploads(status, publish_at)")
+
+    def enqueue(self, file_path: str, metadata: dict, channel: str = YOUTUBE_CHANNEL, publish_at: float = None) -> int:
+        """
+        Adds an upload , by default scheduled `min_interval` after the last job of the channel.
+
+        Returns:
+            id of the queued upload
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            if publish_at is None:
+                last = self._conn.execute(
+                    "SELECT MAX(publish_at) FROM uploads WHERE channel = ? AND status IN ('pending', 'uploading')",
+                    (channel,),
+                ).fetchone()[0]
+                publish_at = now if last is None else max(now, last + self.min_interval)
+            cursor = self._conn.execute(
+                "INSERT INTO uploads (channel, file_path, metadata, publish_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (channel, file_path, json.dumps(metadata), publish_at, now, now),
+            )
+            return cursor.lastrowid
+
+    def _channel_ready(self, channel: str, now: float) -> bool:
+        last_done = self._conn.execute(
+            "SELECT MAX(updated_at) FROM uploads WHERE channel = ? AND status IN ('done', 'uploading')", (channel,)
+        ).fetchone()[0]
+        if last_done is not None and now - last_done < self.min_interval:
+            return False
+        if self.daily_limit > 0:
+            uploaded_today = self._conn.execute(
+                "SELECT COUNT(*) FROM uploads WHERE channel = ? AND status = 'done' AND updated_at > ?",
+                (channel, now - 24 * 3600),
+            ).fetchone()[0]
+            if uploaded_today >= self.daily_limit:
+                return False
+        return True
+
+    def _channel_ready_at(self, channel: str) -> float:
+        """
+        Earliest time the pacing and the daily limit of a channel allow its next upload.
+        """
+        ready_at = 0.0
+        last_done = self._conn.execute(
+            "SELECT MAX(updated_at) FROM uploads WHERE channel = ? AND status IN ('done', 'uploading')", (channel,)
+        ).fetchone()[0]
+        if last_done is not None:
+            ready_at = last_done + self.min_interval
+        if self.daily_limit > 0:
+            done_today = self._conn.execute(
+                "SELECT updated_at FROM uploads WHERE channel = ? AND status = 'done' AND updated_at > ? "
+                "ORDER BY updated_at DESC LIMIT 1 OFFSET ?",
+                (channel, time.time() - 24 * 3600, self.daily_limit - 1),
+            ).fetchone()
+            if done_today is not None:
+                # The limit is reached , the oldest upload that counts for it has to leave the window
+                ready_at = max(ready_at, done_today[0] + 24 * 3600)
+        return ready_at
+
+    def next_due(self):
+        """
+        Earliest time a pending upload could be claimed , its publish time or the end of its channel's pacing.
+
+        Returns:
+            unix time or None when nothing is pending
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT channel, MIN(publish_at) FROM uploads WHERE status = 'pending' GROUP BY channel"
+            ).fetchall()
+            due = [max(publish_at, self._channel_ready_at(channel)) for channel, publish_at in rows]
+        return min(due) if due else None
+
+    def claim_next(self):
+        """
+        Marks the next due upload of a channel that is within its rate limit as uploading.
+
+        Returns:
+            dict with id , channel , file_path , metadata and attempts or None when nothing is due
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, channel, file_path, metadata, attempts FROM uploads "
+                "WHERE status = 'pending' AND publish_at <= ? ORDER BY publish_at, id",
+                (now,),
+            ).fetchall()
+            for upload_id, channel, file_path, metadata, attempts in rows:
+                if not self._channel_ready(channel, now):
+                    continue
+                self._conn.execute(
+                    "UPDATE uploads SET status = 'uploading', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (now, upload_id),
+                )
+                return {"id": upload_id, "channel": channel, "file_path": file_path,
+                        "metadata": json.loads(metadata), "attempts": attempts + 1}
+        return None
+
+    def complete(self, upload_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE uploads SET status = 'done', updated_at = ? WHERE id = ?", (time.time(), upload_id))
+
+    def fail(self, upload_id: int, error: str, max_attempts: int = UPLOAD_MAX_ATTEMPTS, retry_after: float = UPLOAD_RETRY_SECONDS):
+        """
+        Puts a failed upload back in the queue for later , or marks it failed after `max_attempts`.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            attempts = self._conn.execute("SELECT attempts FROM uploads WHERE id = ?", (upload_id,)).fetchone()[0]
+            if attempts >= max_attempts:
+                self._conn.execute(
+                    "UPDATE uploads SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, upload_id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE uploads SET status = 'pending', last_error = ?, publish_at = ?, updated_at = ? WHERE id = ?",
+                    (error, now + retry_after, now, upload_id),
+                )
+
+    def requeue_stale(self, older_than: float = 3600):
+        """
+        Returns uploads left in the uploading state by a crashed worker to the queue.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE uploads SET status = 'pending' WHERE status = 'uploading' AND updated_at < ?",
+                (time.time() - older_than,),
+            )
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM uploads WHERE status IN ('pending', 'uploading')"
+            ).fetchone()[0]
+
+
+def spool_clip(file_path: str, name: str) -> str:
+    """
+    Moves a rendered clip out of its podcast workspace into the upload spool so the cycle cleanup keeps it.
+    """
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    destination = os.path.join(UPLOAD_SPOOL_DIR, name)
+    shutil.move(file_path, destination)
+    return destination
+
+
+def run_worker(queue: UploadQueue, upload_fn, stop_event: threading.Event = None, poll_seconds: float = 30,
+               min_wait: float = 1):
+    """
+    Drains the upload queue until stop_event is set.
+
+    Args:
+        queue (UploadQueue): Queue to drain.
+        upload_fn (callable): upload_fn(file_path , metadata) returning True on success.
+        stop_event (threading.Event): Stops the worker when set , runs forever when None.
+        poll_seconds (float): Longest wait between two looks at the queue when nothing is due.
+        min_wait (float): Shortest wait , keeps the worker from spinning when a job is due but its channel is not.
+    """
+    stop_event = stop_event or threading.Event()
+    queue.requeue_stale()
+    while not stop_event.is_set():
+        job = queue.claim_next()
+        if job is None:
+            # Sleep until the next job could be due , new jobs are picked up within poll_seconds
+            next_due = queue.next_due()
+            wait = poll_seconds if next_due is None else next_due - time.time()
+            stop_event.wait(min(poll_seconds, max(min_wait, wait)))
+            continue
+        try:
+            ok = upload_fn(job["file_path"], job["metadata"])
+            error = None if ok else "upload failed"
+        except Exception as e:
+            ok, error = False, str(e)
+        if ok:
+            queue.complete(job["id"])
+            if os.path.exists(job["file_path"]):
+                os.remove(job["file_path"])
+        else:
+            print(f"[UPLOAD QUEUE] {job['file_path']} attempt {job['attempts']} failed: {error}")
+            queue.fail(job["id"], error)
+
+
+def start_background_worker(queue: UploadQueue, upload_fn, stop_event: threading.Event = None) -> threading.Thread:
+    """
+    Runs `run_worker` in a daemon thread of this process.
+    """
+    thread = threading.Thread(target=run_worker, args=(queue, upload_fn, stop_event), name="upload-queue", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    from tools import upload_video
+
+    print(f"Draining upload queue {UPLOAD_QUEUE_PATH} ...")
+    run_worker(UploadQueue(), upload_video)
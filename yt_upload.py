@@ -5,14 +5,16 @@ import httplib2
 import os
 import random
 import sys
+import threading
 import time
+from types import SimpleNamespace
 
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
-from oauth2client.client import flow_from_clientsecrets
 from oauth2client.file import Storage
-from oauth2client.tools import argparser, run_flow
+
+from constants import UPLOAD_CHUNK_SIZE_MB, UPLOAD_CONCURRENCY
 
 # Explicitly tell the underlying HTTP transport library not to retry, since
 # we are handling retry logic ourselves.
@@ -54,28 +56,88 @@ https://developers.google.com/api-client-library/python/guide/aaa_client_secrets
 
 VALID_PRIVACY_STATUSES = ("public", "private", "unlisted")
 
-def get_authenticated_service(args):
-    flow = flow_from_clientsecrets(CLIENT_SECRETS_FILE,
-        scope=YOUTUBE_UPLOAD_SCOPE,
-        message=MISSING_CLIENT_SECRETS_MESSAGE)
+# Same file the CLI has always written its token to , so imports and `python yt_upload.py` share it
+OAUTH_STORAGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "yt_upload.py-oauth2.json")
+
+# Resumable uploads send chunks in multiples of 256 KiB
+CHUNK_ALIGNMENT = 256 * 1024
+
+
+class UploadError(Exception):
+    """
+    Raised instead of exiting the process when an upload can not be completed.
+    """
+
+
+_service = None
+_credentials = None
+_service_lock = threading.Lock()
+_local = threading.local()
+_upload_slots = threading.BoundedSemaphore(max(1, UPLOAD_CONCURRENCY))
+
+
+def get_authenticated_service(args=None):
+    """
+    Returns the YouTube client , built once per process and reused by every upload.
+
+    The discovery document is taken from the copy bundled with googleapiclient instead of
+    being fetched on every build. Without `args` (the in-process API) missing credentials
+    raise UploadError , the CLI runs the OAuth flow instead.
+    """
+    global _service, _credentials
+    with _service_lock:
+        if _service is not None:
+            return _service
+
+        storage = Storage(OAUTH_STORAGE_FILE)
+        credentials = storage.get()
+
+        if credentials is None or credentials.invalid:
+            if args is None:
+                raise UploadError("OAuth credentials are missing or invalid , run `python yt_upload.py` once on a machine with a browser.")
+            # Only the first authorization needs the OAuth flow
+            from oauth2client.client import flow_from_clientsecrets
+            from oauth2client.tools import run_flow
+            flow = flow_from_clientsecrets(CLIENT_SECRETS_FILE,
+                scope=YOUTUBE_UPLOAD_SCOPE,
+                message=MISSING_CLIENT_SECRETS_MESSAGE)
+            credentials = run_flow(flow, storage, args)
 
-    storage = Storage(f"{sys.argv[0]}-oauth2.json")
-    credentials = storage.get()
+        _credentials = credentials
+        _service = build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION,
+            http=authorized_http(), static_discovery=True)
+        return _service
 
-    # if credentials is None or credentials.invalid:
 
-    if credentials is None or credentials.invalid:
-        credentials = run_flow(flow, storage, args)
+def authorized_http():
+    """
+    Authorized keep-alive connection of the calling thread.
 
-    #     print("OAuth credentials are missing or invalid. Please generate them on a machine with a browser.")
-        sys.exit(1)
+    httplib2 connections are not thread safe , so every uploading thread keeps its own and
+    reuses it for all of its chunks and clips.
+    """
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = _credentials.authorize(httplib2.Http())
+        _local.http = http
+    return http
 
-    
 
-    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION,
-        credentials=credentials)
+def chunk_size_bytes(chunk_size_mb=UPLOAD_CHUNK_SIZE_MB):
+    """
+    Converts UPLOAD_CHUNK_SIZE_MB to the chunksize of MediaFileUpload , -1 sends the file in one request.
+    """
+    if not chunk_size_mb or chunk_size_mb <= 0:
+        return -1
+    size = int(chunk_size_mb * 1024 * 1024)
+    return max(CHUNK_ALIGNMENT, size - size % CHUNK_ALIGNMENT)
 
-def initialize_upload(youtube, options):
+
+def print_progress(file_path, uploaded, total):
+    print(f"Uploading {file_path}: {uploaded * 100 // max(1, total)}%")
+
+
+def initialize_upload(youtube, options, chunksize=-1, progress=None):
     tags = None
     if options.keywords:
         tags = options.keywords.split(",")
@@ -95,25 +157,39 @@ def initialize_upload(youtube, options):
     insert_request = youtube.videos().insert(
         part=",".join(body.keys()),
         body=body,
-        media_body=MediaFileUpload(options.file, chunksize=-1, resumable=True)
+        media_body=MediaFileUpload(options.file, chunksize=chunksize, resumable=True)
     )
 
-    resumable_upload(insert_request)
+    return resumable_upload(insert_request, progress=progress, file_path=options.file)
 
-def resumable_upload(insert_request):
+def resumable_upload(insert_request, progress=None, file_path=None):
+    """
+    Sends the upload chunk by chunk , retrying transient errors with exponential backoff.
+
+    Args:
+        insert_request: videos().insert request with a resumable media body.
+        progress (callable): progress(file_path , uploaded_bytes , total_bytes) after every chunk.
+        file_path (str): Passed through to the progress callback.
+    Returns:
+        id of the uploaded video
+    """
     response = None
     error = None
     retry = 0
 
     while response is None:
+        error = None
         try:
             print("Uploading file...")
-            status, response = insert_request.next_chunk()
+            status, response = insert_request.next_chunk(http=authorized_http())
+            if status is not None and progress is not None:
+                progress(file_path, status.resumable_progress, status.total_size)
             if response is not None:
                 if 'id' in response:
                     print(f"Video id '{response['id']}' was successfully uploaded.")
+                    return response['id']
                 else:
-                    sys.exit(f"The upload failed with an unexpected response: {response}")
+                    raise UploadError(f"The upload failed with an unexpected response: {response}")
         except HttpError as e:
             if e.resp.status in RETRIABLE_STATUS_CODES:
                 error = f"A retriable HTTP error {e.resp.status} occurred:\n{e.content}"
@@ -126,14 +202,56 @@ def resumable_upload(insert_request):
             print(error)
             retry += 1
             if retry > MAX_RETRIES:
-                sys.exit("No longer attempting to retry.")
+                raise UploadError("No longer attempting to retry.")
 
             max_sleep = 2 ** retry
             sleep_seconds = random.random() * max_sleep
             print(f"Sleeping {sleep_seconds:.2f} seconds and then retrying...")
             time.sleep(sleep_seconds)
 
+
+def upload(file_path, title, description="", keywords=(), category="22", privacy_status="public",
+           chunk_size_mb=UPLOAD_CHUNK_SIZE_MB, progress=print_progress):
+    """
+    Uploads a video from inside the running process with the shared client.
+
+    At most UPLOAD_CONCURRENCY uploads run at the same time , extra callers wait for a slot.
+
+    Args:
+        file_path (str): Video file to upload.
+        title (str): Video title.
+        description (str): Video description.
+        keywords (list[str]): Video tags.
+        category (str): Numeric video category.
+        privacy_status (str): One of VALID_PRIVACY_STATUSES.
+        chunk_size_mb (float): Size of every resumable chunk , 0 sends the file in one request.
+        progress (callable): progress(file_path , uploaded_bytes , total_bytes) , None to stay quiet.
+    Returns:
+        id of the uploaded video
+    Raises:
+        UploadError: when the file is missing , credentials are invalid or the upload gives up.
+    """
+    if not os.path.exists(file_path):
+        raise UploadError(f"{file_path} does not exist")
+    options = SimpleNamespace(
+        file=file_path,
+        title=title,
+        description=description,
+        keywords=",".join(keywords),
+        category=category,
+        privacyStatus=privacy_status,
+    )
+    youtube = get_authenticated_service()
+    with _upload_slots:
+        try:
+            return initialize_upload(youtube, options, chunksize=chunk_size_bytes(chunk_size_mb), progress=progress)
+        except HttpError as e:
+            raise UploadError(f"An HTTP error {e.resp.status} occurred:\n{e.content}") from e
+
+
 if __name__ == '__main__':
+    from oauth2client.tools import argparser
+
     argparser.add_argument("--file", required=True, help="Video file to upload")
     argparser.add_argument("--title", help="Video title", default="Test Title")
     argparser.add_argument("--description", help="Video description",
@@ -152,6 +270,8 @@ if __name__ == '__main__':
 
     youtube = get_authenticated_service(args)
     try:
-        initialize_upload(youtube, args)
+        initialize_upload(youtube, args, chunksize=chunk_size_bytes(), progress=print_progress)
     except HttpError as e:
         print(f"An HTTP error {e.resp.status} occurred:\n{e.content}")
+    except UploadError as e:
+        sys.exit(str(e))